@@ -37,8 +37,8 @@ def initialize_classifier():
         preprocessor = TextPreprocessor()
         
         # Initialize Pinecone feedback service for feedback
-        from services.pinecone_feedback_service import PineconeFeedbackService
-        pinecone_feedback_service = PineconeFeedbackService()
+        from services.pinecone_feedback_service import get_pinecone_feedback_service
+        pinecone_feedback_service = get_pinecone_feedback_service()
         
         # Initialize feedback handler with Pinecone feedback service
         feedback_handler = FeedbackHandler(use_azure=True, pinecone_feedback_service=pinecone_feedback_service)
@@ -96,10 +96,10 @@ def initialize_classifier():
 def initialize_feedback_handler():
     """Initialize the feedback handler with Azure Blob Storage and Pinecone feedback support"""
     try:
-        from services.pinecone_feedback_service import PineconeFeedbackService
+        from services.pinecone_feedback_service import get_pinecone_feedback_service
         from utils.azure_blob_helper import FeedbackHandler
         
-        pinecone_feedback_service = PineconeFeedbackService()
+        pinecone_feedback_service = get_pinecone_feedback_service()
         feedback_handler = FeedbackHandler(use_azure=True, pinecone_feedback_service=pinecone_feedback_service)
         
         logger.info("Feedback handler initialized successfully")
@@ -188,11 +188,9 @@ def get_feedback_summary(feedback_handler):
 
         logger.debug(f"recent feedback:\n{recent_feedback.head()}")  # Log first few entries for debugging
 
-        # Use iterrows() instead of itertuples() for better compatibility
-        for _, row in recent_feedback.iterrows():
-            predicted = row['predicted_code']
-            correct = row['correct_code']
-
+        # Plain tuples of just the two code columns avoid building a Series per row, and
+        # name=None sidesteps namedtuple field-name issues with arbitrary column names
+        for predicted, correct in recent_feedback[['predicted_code', 'correct_code']].itertuples(index=False, name=None):
             if predicted != correct:
                 recent_corrections += 1
                 if correct in corrected_codes:
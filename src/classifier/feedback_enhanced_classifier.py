@@ -8,6 +8,7 @@ from .hts_classifier import HTSClassifier
 from utils.azure_blob_helper import FeedbackHandler
 from utils.azure_blob_feedback_trainer import AzureFeedbackTrainer
 from config.settings import Config  # Import the configuration
+from utils.common import l2_normalize, normalize_description
 
 
 class FeedbackEnhancedClassifier(HTSClassifier):
@@ -46,6 +47,8 @@ class FeedbackEnhancedClassifier(HTSClassifier):
         self.last_feedback_check = datetime.now()
         self.feedback_cache = {}
         self.cache_duration = Config.FEEDBACK_CACHE_DURATION
+        self._exact_match_index = {}
+        self._exact_match_source = None
         
         # Initialize Azure trainer if available
         try:
@@ -82,10 +85,13 @@ class FeedbackEnhancedClassifier(HTSClassifier):
             logger.info(f"🔍 Starting enhanced classification for: '{product_description}'")
             logger.info(f"🧠 Learning enabled: {learn_from_feedback}")
             
+            # Query the feedback index once and share the result between the exact and semantic lookups
+            pinecone_lookup = self._lookup_pinecone_feedback(product_description) if learn_from_feedback else None
+            
             # STEP 1: Check for exact feedback matches first (HIGHEST PRIORITY)
             if learn_from_feedback:
                 logger.info("🎯 STEP 1: Checking for exact feedback matches...")
-                exact_match = self._check_exact_feedback_match(product_description)
+                exact_match = self._check_exact_feedback_match(product_description, pinecone_lookup)
                 
                 if exact_match:
                     logger.info("🎯 Found exact feedback match - using learned correction")
@@ -95,7 +101,7 @@ class FeedbackEnhancedClassifier(HTSClassifier):
              # STEP 2: Check for semantic feedback matches (HIGH PRIORITY)
             if learn_from_feedback:
                 logger.info("🤖 STEP 2: Checking for semantic feedback matches...")
-                semantic_matches = self._find_semantic_feedback_matches(product_description)
+                semantic_matches = self._find_semantic_feedback_matches(product_description, pinecone_lookup)
                 
                 if semantic_matches:
                     logger.info(f"🤖 Found {len(semantic_matches)} semantic matches")
@@ -158,7 +164,7 @@ class FeedbackEnhancedClassifier(HTSClassifier):
                 # ADDED: Final fallback - use any semantic matches if available
                 if learn_from_feedback:
                     logger.info("🔄 Checking for any semantic matches as final fallback...")
-                    semantic_matches = self._find_semantic_feedback_matches(product_description)
+                    semantic_matches = self._find_semantic_feedback_matches(product_description, pinecone_lookup)
                     if semantic_matches:
                         best_match = semantic_matches[0]
                         logger.info(f"🔄 Using semantic fallback (similarity: {best_match['similarity_score']:.1%})")
@@ -177,12 +183,33 @@ class FeedbackEnhancedClassifier(HTSClassifier):
                 logger.error(f"Fallback classification also failed: {str(fallback_error)}")
                 return []
     
-    def _check_exact_feedback_match(self, product_description: str) -> Optional[Dict]:
+    def _lookup_pinecone_feedback(self, product_description: str) -> Optional[Dict]:
+        """
+        Fetch exact and semantic feedback matches with one Pinecone lookup.
+        
+        Args:
+            product_description: Product description to look up
+            
+        Returns:
+            Lookup result from PineconeFeedbackService.lookup, or None without a feedback service
+        """
+        if not self.pinecone_feedback_service:
+            return None
+        
+        return self.pinecone_feedback_service.lookup(
+            product_description,
+            top_k=10,
+            similarity_threshold=self.semantic_threshold
+        )
+    
+    def _check_exact_feedback_match(self, product_description: str,
+                                    pinecone_lookup: Optional[Dict] = None) -> Optional[Dict]:
         """
         Check for exact matches in feedback data using Pinecone first, then fallback.
         
         Args:
             product_description: Product description to check
+            pinecone_lookup: Optional result of _lookup_pinecone_feedback for the description
             
         Returns:
             Dictionary with exact match data or None
@@ -190,7 +217,10 @@ class FeedbackEnhancedClassifier(HTSClassifier):
         try:
             # Try Pinecone feedback service first if available
             if self.pinecone_feedback_service:
-                exact_match = self.pinecone_feedback_service.check_exact_match(product_description)
+                if pinecone_lookup is not None:
+                    exact_match = pinecone_lookup['exact']
+                else:
+                    exact_match = self.pinecone_feedback_service.check_exact_match(product_description)
                 if exact_match:
                     logger.info("🎯 Found exact feedback match via Pinecone feedback service")
                     return exact_match
@@ -203,13 +233,11 @@ class FeedbackEnhancedClassifier(HTSClassifier):
                 return None
             
             # Look for exact description match (case-insensitive)
-            exact_matches = recent_feedback[
-                recent_feedback['description'].str.lower().str.strip() == product_description.lower().strip()
-            ]
+            position = self._get_exact_match_index(recent_feedback).get(normalize_description(product_description))
             
-            if not exact_matches.empty:
+            if position is not None:
                 # Get the most recent exact match
-                latest_match = exact_matches.iloc[-1]
+                latest_match = recent_feedback.iloc[position]
                 
                 logger.info(f"🎯 Found exact feedback match for product: {latest_match['correct_code']}")
                 
@@ -228,12 +256,34 @@ class FeedbackEnhancedClassifier(HTSClassifier):
             logger.error(f"Error checking exact feedback matches: {str(e)}")
             return None
     
-    def _find_semantic_feedback_matches(self, product_description: str) -> List[Dict]:
+    def _get_exact_match_index(self, feedback_df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Map normalized feedback descriptions to the position of their most recent row.
+        
+        The index is rebuilt only when a new feedback DataFrame is loaded, so each
+        exact-match check is a single dictionary lookup instead of a column scan.
+        
+        Args:
+            feedback_df: Feedback DataFrame returned by _get_recent_feedback_data
+            
+        Returns:
+            Dictionary of lowercased, stripped description to row position
+        """
+        if feedback_df is not self._exact_match_source:
+            normalized = feedback_df['description'].str.lower().str.strip()
+            # Later rows overwrite earlier ones, so each key points at the latest entry
+            self._exact_match_index = {description: position for position, description in enumerate(normalized)}
+            self._exact_match_source = feedback_df
+        return self._exact_match_index
+    
+    def _find_semantic_feedback_matches(self, product_description: str,
+                                        pinecone_lookup: Optional[Dict] = None) -> List[Dict]:
         """
         Find semantically similar products using Pinecone feedback service first, then fallback to re-embedding.
         
         Args:
             product_description: Product description to find matches for
+            pinecone_lookup: Optional result of _lookup_pinecone_feedback for the description
             
         Returns:
             List of similar feedback matches with similarity scores
@@ -244,11 +294,14 @@ class FeedbackEnhancedClassifier(HTSClassifier):
                 logger.info("🤖 Using Pinecone feedback service for semantic feedback matching")
                 
                 # Search using Pinecone feedback service
-                semantic_matches = self.pinecone_feedback_service.search_similar_feedback(
-                    product_description, 
-                    top_k=10, 
-                    similarity_threshold=self.semantic_threshold
-                )
+                if pinecone_lookup is not None:
+                    semantic_matches = pinecone_lookup['similar']
+                else:
+                    semantic_matches = self.pinecone_feedback_service.search_similar_feedback(
+                        product_description, 
+                        top_k=10, 
+                        similarity_threshold=self.semantic_threshold
+                    )
                 
                 if semantic_matches:
                     # Add confidence scores
@@ -292,30 +345,31 @@ class FeedbackEnhancedClassifier(HTSClassifier):
             feedback_embeddings = self.preprocessor.encode_text(feedback_descriptions)
             logger.info(f"🤖 Generated {len(feedback_embeddings)} feedback embeddings")
             
-            # Calculate semantic similarities using pure NumPy (no scikit-learn)
+            # Calculate semantic similarities using pure NumPy (no scikit-learn): with unit-length
+            # rows in one contiguous float32 matrix, every cosine is a single matrix-vector product
+            feedback_matrix = np.ascontiguousarray(l2_normalize(feedback_embeddings))
+            similarities = np.clip(feedback_matrix @ l2_normalize(input_embedding), 0.0, 1.0)
+            
+            # Only include corrections (where predicted != correct) above the threshold
+            is_correction = recent_feedback['predicted_code'].to_numpy() != recent_feedback['correct_code'].to_numpy()
+            match_rows = np.flatnonzero((similarities >= self.semantic_threshold) & is_correction)
+            
+            # Sort by similarity (highest first), keeping feedback order among equal scores
+            match_rows = match_rows[np.argsort(-similarities[match_rows], kind='stable')]
+            
             semantic_matches = []
-            for idx, feedback_embedding in enumerate(feedback_embeddings):
-                
-                # Calculate cosine similarity without scikit-learn
-                similarity = self._calculate_cosine_similarity(input_embedding, feedback_embedding)
-                
-                if similarity >= self.semantic_threshold:
-                    feedback_row = recent_feedback.iloc[idx]
-                    
-                    # Only include corrections (where predicted != correct)
-                    if feedback_row['predicted_code'] != feedback_row['correct_code']:
-                        semantic_matches.append({
-                            'description': feedback_row['description'],
-                            'predicted_code': feedback_row['predicted_code'],
-                            'correct_code': feedback_row['correct_code'],
-                            'similarity_score': float(similarity),
-                            'timestamp': feedback_row['timestamp'],
-                            'confidence': self._calculate_semantic_confidence(similarity)
-                        })
-                        logger.info(f"🤖 Found semantic match: {similarity:.1%} similarity - '{feedback_row['description'][:50]}...'")
-            
-            # Sort by similarity (highest first)
-            semantic_matches.sort(key=lambda x: x['similarity_score'], reverse=True)
+            for idx in match_rows:
+                similarity = float(similarities[idx])
+                feedback_row = recent_feedback.iloc[idx]
+                semantic_matches.append({
+                    'description': feedback_row['description'],
+                    'predicted_code': feedback_row['predicted_code'],
+                    'correct_code': feedback_row['correct_code'],
+                    'similarity_score': similarity,
+                    'timestamp': feedback_row['timestamp'],
+                    'confidence': self._calculate_semantic_confidence(similarity)
+                })
+                logger.info(f"🤖 Found semantic match: {similarity:.1%} similarity - '{feedback_row['description'][:50]}...'")
             
             logger.info(f"🤖 Found {len(semantic_matches)} semantic matches above {self.semantic_threshold:.1%} threshold")
             return semantic_matches
@@ -324,39 +378,6 @@ class FeedbackEnhancedClassifier(HTSClassifier):
             logger.error(f"Error finding semantic feedback matches (fallback): {str(e)}")
             return []
     
-    def _calculate_cosine_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
-        """
-        Calculate cosine similarity between two embeddings using pure NumPy.
-        
-        Args:
-            embedding1: First embedding vector
-            embedding2: Second embedding vector
-            
-        Returns:
-            Cosine similarity score (0-1)
-        """
-        try:
-            # Ensure embeddings are numpy arrays
-            embedding1 = np.array(embedding1)
-            embedding2 = np.array(embedding2)
-            
-            # Calculate norms
-            norm1 = np.linalg.norm(embedding1)
-            norm2 = np.linalg.norm(embedding2)
-            
-            if norm1 == 0 or norm2 == 0:
-                return 0.0
-            
-            # Calculate cosine similarity using dot product
-            similarity = np.dot(embedding1, embedding2) / (norm1 * norm2)
-            
-            # Ensure result is between 0 and 1 (handle floating point errors)
-            return max(0.0, min(1.0, float(similarity)))
-            
-        except Exception as e:
-            logger.error(f"Error calculating cosine similarity: {str(e)}")
-            return 0.0
-    
     def _calculate_semantic_confidence(self, similarity_score: float) -> float:
         """
         Calculate confidence based on semantic similarity score.
@@ -782,9 +803,10 @@ class FeedbackEnhancedClassifier(HTSClassifier):
             if len(corrections) > 0:
                 # Find correction patterns
                 pattern_counts = {}
-                for _, row in corrections.iterrows():
-                    pred_chapter = row['predicted_code'][:4] if len(row['predicted_code']) >= 4 else row['predicted_code']
-                    correct_chapter = row['correct_code'][:4] if len(row['correct_code']) >= 4 else row['correct_code']
+                # Plain tuples avoid building a Series per row
+                for predicted_code, correct_code in corrections[['predicted_code', 'correct_code']].itertuples(index=False, name=None):
+                    pred_chapter = predicted_code[:4] if len(predicted_code) >= 4 else predicted_code
+                    correct_chapter = correct_code[:4] if len(correct_code) >= 4 else correct_code
                     pattern = f"{pred_chapter} → {correct_chapter}"
                     pattern_counts[pattern] = pattern_counts.get(pattern, 0) + 1
                 
@@ -4,7 +4,7 @@ from loguru import logger
 
 from config.settings import Config, HTSMappings
 from services.embedding_service import EmbeddingService
-from services.gpt_service import GPTValidationService
+from services.gpt_service import get_gpt_service
 from models.hts_models import ClassificationResult
 from utils.common import extract_chapter_info
 from utils.logging_utils import log_classification_attempt, log_feedback_addition
@@ -21,7 +21,7 @@ class HTSClassifier:
         
         # Initialize services
         self.embedding_service = EmbeddingService()
-        self.gpt_service = GPTValidationService()
+        self.gpt_service = get_gpt_service()
         
         # Import and initialize feedback handler with Pinecone feedback service
         from utils.azure_blob_helper import FeedbackHandler
@@ -65,64 +65,104 @@ class HTSClassifier:
         """Classify a product description into HTS codes."""
         try:
             log_classification_attempt(product_description)
-            
-            # Check explicit product mappings first
-            matching_codes = self.data_loader.find_matching_codes(product_description)
-            results = []
-            
-            # If no mapping matches, use similarity search
+
+            # Use similarity search
             clean_query = self.preprocessor.clean_text(product_description)
             query_embedding = self.preprocessor.encode_text([clean_query])
             
-            # Search using embedding service
-            search_results = self.embedding_service.search_similar(query_embedding[0], top_k * 5)
+            return self._classify_embedding(clean_query, query_embedding[0], top_k)
+            
+        except Exception as e:
+            logger.error(f"Error in classification: {str(e)}")
+            raise
+
+    def classify_batch(self, product_descriptions: List[str], top_k: int = 3) -> List[List[Dict]]:
+        """
+        Classify several product descriptions with a single embedding request.
+        
+        Args:
+            product_descriptions: Product descriptions to classify
+            top_k: Number of top results to return per description
             
-            # Process results with dynamic thresholding
-            seen_chapters = set()
-            threshold = self._determine_confidence_threshold(clean_query)
+        Returns:
+            One list of classification results per input description, in input order
+        """
+        try:
+            if not product_descriptions:
+                return []
             
-            for match in search_results.matches:
-                hts_code = match.metadata['hts_code']
-                chapter_info = extract_chapter_info(hts_code)
-                
-                if chapter_info['chapter'] in seen_chapters and len(results) >= top_k:
-                    continue
-                
-                hts_info = self.data_loader.get_hts_code_info(hts_code)
-                hts_info['hts_code'] = hts_code
-                
-                # Get hierarchical description
-                full_description = self.data_loader.hts_code_backwalk(hts_code)
-                
-                # Validate with GPT
-                chapter_context = self.get_chapter_context(hts_code)
-                confidence = self.gpt_service.validate_hts_match(
-                    full_description or hts_info.get('description', ''), 
-                    hts_info, 
-                    chapter_context
-                )
-                
-                if confidence > threshold:
-                    result = ClassificationResult(
-                        hts_code=hts_code,
-                        description=full_description if full_description else hts_info.get('description', ''),
-                        confidence=round(confidence, 2),
-                        general_rate=hts_info.get('general', 'N/A'),
-                        units=hts_info.get('units', []),
-                        chapter_context=chapter_context
-                    )
-                    
-                    results.append(result.__dict__)
-                    seen_chapters.add(chapter_info['chapter'])
-            
-            # Sort by confidence and return top_k
-            results.sort(key=lambda x: x['confidence'], reverse=True)
-            return results[:top_k]
+            logger.info(f"Batch classification of {len(product_descriptions)} descriptions")
+            
+            # Clean and embed every query up front so the OpenAI round-trip is paid once
+            clean_queries = self.preprocessor.preprocess_descriptions(product_descriptions)
+            query_embeddings = self.preprocessor.encode_text(clean_queries)
+            
+            batch_results = []
+            for description, clean_query, query_embedding in zip(product_descriptions, clean_queries, query_embeddings):
+                log_classification_attempt(description)
+                try:
+                    batch_results.append(self._classify_embedding(clean_query, query_embedding, top_k))
+                except Exception as e:
+                    logger.error(f"Error in batch classification for '{description[:50]}': {str(e)}")
+                    batch_results.append([])
+            
+            return batch_results
             
         except Exception as e:
-            logger.error(f"Error in classification: {str(e)}")
+            logger.error(f"Error in batch classification: {str(e)}")
             raise
 
+    def _classify_embedding(self, clean_query: str, query_embedding: np.ndarray, top_k: int) -> List[Dict]:
+        """Rank and validate HTS candidates for an already-embedded query."""
+        results = []
+        
+        # Search using embedding service
+        search_results = self.embedding_service.search_similar(query_embedding, top_k * 5)
+        
+        # Process results with dynamic thresholding
+        seen_chapters = set()
+        threshold = self._determine_confidence_threshold(clean_query)
+        
+        candidates = []
+        for match in search_results.matches:
+            hts_code = match.metadata['hts_code']
+            hts_info = self.data_loader.get_hts_code_info(hts_code)
+            hts_info['hts_code'] = hts_code
+            
+            # Get hierarchical description
+            full_description = self.data_loader.hts_code_backwalk(hts_code)
+            chapter_context = self.get_chapter_context(hts_code)
+            candidates.append((hts_code, hts_info, full_description, chapter_context))
+        
+        # Score all candidates with GPT together rather than one round-trip at a time
+        confidences = self.gpt_service.validate_hts_matches([
+            (full_description or hts_info.get('description', ''), hts_info, chapter_context)
+            for _, hts_info, full_description, chapter_context in candidates
+        ])
+        
+        for (hts_code, hts_info, full_description, chapter_context), confidence in zip(candidates, confidences):
+            chapter_info = extract_chapter_info(hts_code)
+            
+            if chapter_info['chapter'] in seen_chapters and len(results) >= top_k:
+                continue
+            
+            if confidence > threshold:
+                result = ClassificationResult(
+                    hts_code=hts_code,
+                    description=full_description if full_description else hts_info.get('description', ''),
+                    confidence=round(confidence, 2),
+                    general_rate=hts_info.get('general', 'N/A'),
+                    units=hts_info.get('units', []),
+                    chapter_context=chapter_context
+                )
+                
+                results.append(result.__dict__)
+                seen_chapters.add(chapter_info['chapter'])
+        
+        # Sort by confidence and return top_k
+        results.sort(key=lambda x: x['confidence'], reverse=True)
+        return results[:top_k]
+
     def _determine_confidence_threshold(self, clean_query: str) -> float:
         """Determine confidence threshold based on product type."""
         clean_query_lower = clean_query.lower()
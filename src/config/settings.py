@@ -21,13 +21,20 @@ class Config:
     # Azure OpenAI Configuration
     AZURE_OPENAI_API_KEY = os.getenv('AZURE_OPENAI_API_KEY')
     AZURE_OPENAI_ENDPOINT = os.getenv('AZURE_OPENAI_ENDPOINT')
+    # Optional extra deployments (comma-separated, same order) used when the primary is throttled
+    AZURE_OPENAI_FAILOVER_ENDPOINTS = [e.strip() for e in os.getenv('AZURE_OPENAI_FAILOVER_ENDPOINTS', '').split(',') if e.strip()]
+    AZURE_OPENAI_FAILOVER_API_KEYS = [k.strip() for k in os.getenv('AZURE_OPENAI_FAILOVER_API_KEYS', '').split(',') if k.strip()]
     AZURE_OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+    AZURE_OPENAI_EMBEDDING_DIMENSION = 1536  # vector size of the embedding model; None to probe the API
     AZURE_OPENAI_CHAT_MODEL = "gpt-4"
     AZURE_OPENAI_API_VERSION = "2024-12-01-preview"
     AZURE_FEEDBACK_BLOB_KEY = "feedback-data-canada.csv"
     AZURE_STORAGE_ACCOUNT_NAME="abscustoms"
     AZURE_CONTAINER_NAME="feedback-customs-canada"
     AZURE_STORAGE_CONNECTION_STRING = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
+    AZURE_DOWNLOAD_CONCURRENCY = 8  # parallel range requests per blob download
+    AZURE_UPLOAD_CONCURRENCY = 8  # parallel block uploads per blob upload
+    AZURE_CONNECTION_POOL_SIZE = 32  # pooled HTTP connections shared by all blob transfers
     
     # Pinecone Configuration
     PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
@@ -35,6 +42,8 @@ class Config:
     PINECONE_FEEDBACK_INDEX_NAME = "hts-feedback"  # New feedback index
     PINECONE_CLOUD = "aws"
     PINECONE_REGION = "us-east-1"
+    PINECONE_POOL_THREADS = 30  # max concurrent async upsert batches
+    PINECONE_LIST_INDEXES_TTL = 30  # seconds the list of existing indexes is reused
     
     # Classification Settings
     SEMANTIC_THRESHOLD = 0.50
@@ -48,15 +57,41 @@ class Config:
     # Feedback Settings
     FEEDBACK_CACHE_DURATION = 5  # minutes
     DEFAULT_FEEDBACK_DAYS = 30
+    FEEDBACK_REPORT_CACHE_TTL = 60  # seconds a feedback download is reused by trainer reports
     
     # Pinecone Feedback Configuration
     PINECONE_FEEDBACK_SIMILARITY_THRESHOLD = 0.5
     PINECONE_FEEDBACK_TOP_K_DEFAULT = 5
+    PINECONE_FEEDBACK_METRIC = "dotproduct"  # vectors are stored unit-length, so this ranks like cosine
     
     # System Settings
     BATCH_SIZE = 100
+    EMBED_CONCURRENCY = 4  # parallel embedding requests
+    EMBED_MAX_BATCH_TOKENS = 8000  # token budget per embedding request
+    EMBED_QUERY_CACHE_SIZE = 4096  # single-query embeddings kept in memory
     MAX_RETRIES = 3
+    OPENAI_CONNECT_TIMEOUT = 2.0  # seconds
+    OPENAI_READ_TIMEOUT = 10.0
+    OPENAI_WRITE_TIMEOUT = 5.0
+    OPENAI_POOL_TIMEOUT = 2.0
     BASE_DELAY = 1  # seconds
+    # Azure quotas are per model deployment, so chat and embedding calls are limited separately;
+    # each budget is shared across all OpenAI callers of that model on an endpoint
+    OPENAI_CHAT_MAX_REQUESTS_PER_MINUTE = int(os.getenv('OPENAI_CHAT_MAX_REQUESTS_PER_MINUTE', '300'))
+    OPENAI_CHAT_MAX_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_CHAT_MAX_TOKENS_PER_MINUTE', '120000'))
+    OPENAI_EMBEDDING_MAX_REQUESTS_PER_MINUTE = int(os.getenv('OPENAI_EMBEDDING_MAX_REQUESTS_PER_MINUTE', '2100'))
+    OPENAI_EMBEDDING_MAX_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_EMBEDDING_MAX_TOKENS_PER_MINUTE', '350000'))
+    OPENAI_DEPLOYMENT_COOLDOWN = 30  # seconds a throttled deployment is skipped without Retry-After
+    HTTP_MAX_CONNECTIONS = 100  # OpenAI HTTP connection pool size
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = 50
+    GPT_MAX_CONCURRENCY = 8  # concurrent GPT validation requests per batch
+    # JSON-schema replies; only for deployments that support structured outputs (classic gpt-4 does not)
+    GPT_STRUCTURED_OUTPUT = os.getenv('GPT_STRUCTURED_OUTPUT', 'false').lower() == 'true'
+    GPT_MAX_DESCRIPTION_TOKENS = 1000  # longer product descriptions are truncated in GPT prompts
+    GPT_MAX_INPUT_TOKENS = 6000  # prompt budget within the chat model's context window
+    GPT_RESPONSE_CACHE_SIZE = 50000  # in-memory LRU of GPT confidence scores
+    GPT_SCORE_CACHE_FILE = "gpt_scores.sqlite3"  # persistent GPT score cache in CACHE_DIR
+    GPT_SCORE_CACHE_TTL = 30 * 24 * 3600  # seconds
     LOG_ROTATION = "500 MB"
 
     # Log file names - centralized configuration
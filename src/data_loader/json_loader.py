@@ -110,14 +110,19 @@ class HTSDataLoader:
             self.hts_data.append(item)
             
             # Create mapping for quick lookups with cleaned values
+            general = item.get('general', '').strip()
+            units = [u.strip() for u in item.get('units', []) if u.strip()]
             self.hts_code_map[hts_code] = {
                 'description': item['description'].strip(),
                 'indent': str(item.get('indent', '0')),
-                'general': item.get('general', '').strip(),
-                'units': [u.strip() for u in item.get('units', []) if u.strip()],
+                'general': general,
+                'units': units,
                 'special': item.get('special', '').strip(),
                 'other': item.get('other', '').strip(),
-                'footnotes': item.get('footnotes', [])
+                'footnotes': item.get('footnotes', []),
+                # Prompt-ready renderings, formatted once here rather than per GPT request
+                'general_rate_str': general or 'N/A',
+                'units_str': ', '.join(units) or 'N/A'
             }
     
 
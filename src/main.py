@@ -1,4 +1,7 @@
 import os
+import sys
+import asyncio
+from functools import partial
 from pathlib import Path
 from loguru import logger
 from data_loader.json_loader import HTSDataLoader
@@ -6,6 +9,13 @@ from preprocessor.text_processor import TextPreprocessor
 from classifier.hts_classifier import HTSClassifier
 from utils.logging_utils import setup_logger, log_system_startup, log_system_error
 
+try:
+    from prompt_toolkit import PromptSession
+    PROMPT_TOOLKIT_AVAILABLE = True
+except ImportError:
+    PromptSession = None
+    PROMPT_TOOLKIT_AVAILABLE = False
+
 def setup_logging():
     """Configure logging settings with proper initialization."""
     try:
@@ -16,8 +26,75 @@ def setup_logging():
         print(f"Failed to setup logging: {e}")
         return False
 
-def main():
-    """Main entry point for HTS classification system."""
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call in the default executor so the event loop stays responsive."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+def create_prompt():
+    """Create the async line reader used by the REPL (prompt_toolkit with history, or input())."""
+    # prompt_toolkit needs a real terminal; piped stdin goes through input()
+    if PROMPT_TOOLKIT_AVAILABLE and sys.stdin.isatty():
+        return PromptSession().prompt_async
+    
+    async def read_line(message: str) -> str:
+        return await run_blocking(input, message)
+    
+    return read_line
+
+async def persist_feedback(classifier, feedback_lock: asyncio.Lock, description: str,
+                           predicted_code: str, correct_code: str):
+    """Record feedback in the background; writes are serialized to avoid lost updates."""
+    async with feedback_lock:
+        try:
+            await run_blocking(
+                classifier.add_feedback,
+                product_description=description,
+                predicted_code=predicted_code,
+                correct_code=correct_code
+            )
+            logger.info(f"Feedback recorded: {predicted_code} -> {correct_code}")
+        except Exception as e:
+            log_system_error("Feedback", str(e))
+
+def print_results(results):
+    """Print classification results in the standard REPL format."""
+    print("\nTop matches:")
+    print("-" * 80)
+    for i, result in enumerate(results, 1):
+        print(f"{i}. HTS Code: {result['hts_code']}")
+        print(f"   Description: {result['description']}")
+        print(f"   Confidence: {result['confidence']}%")
+        print(f"   General Rate: {result['general_rate']}")
+        if result['units']:
+            print(f"   Units: {', '.join(result['units'])}")
+        print("-" * 80)
+
+async def run_batch(classifier, file_path: str):
+    """Classify every non-empty line of a file with one batched request."""
+    path = Path(file_path).expanduser()
+    if not path.is_file():
+        print(f"File not found: {path}")
+        return
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        descriptions = [line.strip() for line in f if line.strip()]
+    
+    if not descriptions:
+        print("No descriptions found in file")
+        return
+    
+    logger.info(f"Processing batch classification request: {len(descriptions)} descriptions from {path}")
+    batch_results = await run_blocking(classifier.classify_batch, descriptions)
+    
+    for description, results in zip(descriptions, batch_results):
+        print(f"\n=== {description}")
+        print_results(results)
+    
+    logger.info(f"Batch classification completed - {len(batch_results)} descriptions processed")
+
+async def main_async():
+    """Async REPL for the HTS classification system."""
     # Initialize logging first
     if not setup_logging():
         print("Warning: Logging setup failed, continuing without proper logging")
@@ -39,25 +116,41 @@ def main():
         data_loader.load_all_chapters()
         
         logger.info("Building search index...")
-        classifier.build_index()
+        await run_blocking(classifier.build_index)
         
         logger.info("System initialization completed successfully")
         
         # Interactive classification loop
         print("\nHTS Code Classification System")
         print("Enter 'quit' to exit")
-        print("Enter 'stats' to view feedback statistics\n")
+        print("Enter 'stats' to view feedback statistics")
+        print("Enter 'batch <file>' to classify one description per line of a file\n")
+        
+        read_line = create_prompt()
+        feedback_lock = asyncio.Lock()
+        pending_feedback = set()
         
         while True:
-            description = input("Enter product description: ").strip()
+            try:
+                description = (await read_line("Enter product description: ")).strip()
+            except EOFError:
+                description = 'quit'
             
             if description.lower() == 'quit':
                 logger.info("User requested system shutdown")
                 break
+            
+            if description.lower().startswith('batch '):
+                try:
+                    await run_batch(classifier, description[len('batch '):].strip())
+                except Exception as e:
+                    log_system_error("Batch Classification", str(e))
+                    print(f"Error processing batch: {str(e)}")
+                continue
                 
             if description.lower() == 'stats':
                 try:
-                    stats = classifier.get_feedback_stats()
+                    stats = await run_blocking(classifier.get_feedback_stats)
                     logger.info("Feedback statistics requested")
                     print("\nClassification Feedback Statistics:")
                     print(f"Total entries: {stats['total_entries']}")
@@ -78,52 +171,49 @@ def main():
                 
             try:
                 logger.info(f"Processing classification request: {description[:100]}...")
-                results = classifier.classify(description)
+                results = await run_blocking(classifier.classify, description)
                 
-                print("\nTop matches:")
-                print("-" * 80)
-                for i, result in enumerate(results, 1):
-                    print(f"{i}. HTS Code: {result['hts_code']}")
-                    print(f"   Description: {result['description']}")
-                    print(f"   Confidence: {result['confidence']}%")
-                    print(f"   General Rate: {result['general_rate']}")
-                    if result['units']:
-                        print(f"   Units: {', '.join(result['units'])}")
-                    print("-" * 80)
+                print_results(results)
                 
                 logger.info(f"Classification completed - returned {len(results)} results")
                 
                 # Get feedback from user
                 while True:
-                    feedback = input("\nIs the top prediction correct? (y/n): ").strip().lower()
+                    feedback = (await read_line("\nIs the top prediction correct? (y/n): ")).strip().lower()
                     if feedback in ['y', 'n']:
                         break
                     print("Please enter 'y' for yes or 'n' for no")
                 
                 if feedback == 'n':
-                    correct_code = input("Please enter the correct HTS code: ").strip()
+                    correct_code = (await read_line("Please enter the correct HTS code: ")).strip()
                     if correct_code:
-                        try:
-                            classifier.add_feedback(
-                                product_description=description,
-                                predicted_code=results[0]['hts_code'],
-                                correct_code=correct_code
-                            )
-                            print("Thank you for your feedback!")
-                            logger.info(f"Feedback recorded: {results[0]['hts_code']} -> {correct_code}")
-                        except Exception as e:
-                            log_system_error("Feedback", str(e))
-                            print("Error recording feedback")
+                        # Persist in the background so the prompt returns immediately
+                        task = asyncio.create_task(persist_feedback(
+                            classifier, feedback_lock, description,
+                            results[0]['hts_code'], correct_code
+                        ))
+                        pending_feedback.add(task)
+                        task.add_done_callback(pending_feedback.discard)
+                        print("Thank you for your feedback!")
                 else:
                     logger.info("User confirmed prediction was correct")
                         
             except Exception as e:
                 log_system_error("Classification", str(e))
                 print(f"Error processing request: {str(e)}")
+        
+        # Let background feedback writes finish before exiting
+        if pending_feedback:
+            logger.info(f"Waiting for {len(pending_feedback)} pending feedback writes")
+            await asyncio.gather(*pending_feedback)
                 
     except Exception as e:
         log_system_error("System", str(e))
         print(f"Error initializing system: {str(e)}")
 
+def main():
+    """Main entry point for HTS classification system."""
+    asyncio.run(main_async())
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
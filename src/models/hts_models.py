@@ -2,9 +2,19 @@
 Data models for HTS classification system.
 """
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
+@lru_cache(maxsize=1024)
+def _parse_iso_timestamp(timestamp: str) -> datetime:
+    """Parse an ISO timestamp; memoized since batch-imported feedback shares timestamps."""
+    return datetime.fromisoformat(timestamp)
+
+def _to_datetime(timestamp: Union[str, datetime]) -> datetime:
+    """Convert a stored timestamp to datetime, passing datetime values through."""
+    return _parse_iso_timestamp(timestamp) if isinstance(timestamp, str) else timestamp
+
 @dataclass
 class HTSEntry:
     """Model for HTS entry data."""
@@ -49,7 +59,7 @@ class FeedbackEntry:
     def from_dict(cls, data: Dict[str, Any]) -> 'FeedbackEntry':
         """Create FeedbackEntry from dictionary."""
         return cls(
-            timestamp=datetime.fromisoformat(data['timestamp']) if isinstance(data['timestamp'], str) else data['timestamp'],
+            timestamp=_to_datetime(data['timestamp']),
             description=data['description'],
             predicted_code=data['predicted_code'],
             correct_code=data['correct_code'],
@@ -85,7 +95,7 @@ class PineconeFeedbackEntry:
             predicted_code=result['predicted_code'],
             correct_code=result['correct_code'],
             similarity_score=result['similarity_score'],
-            timestamp=datetime.fromisoformat(result['timestamp']) if isinstance(result['timestamp'], str) else result['timestamp'],
+            timestamp=_to_datetime(result['timestamp']),
             pinecone_id=result['pinecone_id'],
             confidence=result.get('confidence')
         )
@@ -1,11 +1,23 @@
 import re
-from typing import List
+from typing import Dict, List, Pattern, Tuple
 import numpy as np
 from loguru import logger
 
 from config.settings import Config, HTSMappings
 from services.embedding_service import EmbeddingService
 
+# Special product formats, compiled once at import
+_KARAT_PATTERN = re.compile(r'(\d+)\s*k\s*gold')
+_DIMENSION_PATTERN = re.compile(r'(\d+)\s*x\s*(\d+)')
+_PERCENT_PATTERN = re.compile(r'(\d+)\s*(?:percent|pct)\b')
+
+# Number followed by a unit suffix ("12 v", "60 cm"); the unit is normalized via _UNIT_SUFFIXES
+_UNIT_PATTERN = re.compile(r'(\d+)\s*(v|w|hz|mm?|cm?)\b')
+_UNIT_SUFFIXES = {'v': 'v', 'w': 'w', 'hz': 'hz', 'm': 'mm', 'mm': 'mm', 'c': 'cm', 'cm': 'cm'}
+
+# Any run of characters outside the kept set (including whitespace) collapses to one space
+_DISALLOWED_CHARS_PATTERN = re.compile(r'[^a-z0-9\-%/]+')
+
 class TextPreprocessor:
     def __init__(self):
         """Initialize the text preprocessor."""
@@ -95,6 +107,28 @@ class TextPreprocessor:
             'coffee maker': 'electric coffee maker appliance heating 8516',
             'appliance': 'electric appliance household 85'
         }
+        
+        # Precompile replacement patterns so clean_text skips the re module cache lookup.
+        # Material and state rules never overlap, so each table runs as a single alternation;
+        # measurement rules feed into each other (e.g. 'gram' runs before 'milligram') and
+        # must stay sequential to keep the existing output.
+        self._material_pattern, self._material_values = self._compile_alternation(self.material_replacements)
+        self._measurement_patterns = self._compile_replacements(self.measurement_replacements)
+        self._state_pattern, self._state_values = self._compile_alternation(self.state_replacements)
+    
+    @staticmethod
+    def _compile_replacements(replacements: Dict[str, str]) -> List[Tuple[Pattern, str]]:
+        """Compile a pattern -> replacement mapping, preserving its order."""
+        return [(re.compile(pattern), replacement) for pattern, replacement in replacements.items()]
+    
+    @staticmethod
+    def _compile_alternation(replacements: Dict[str, str]) -> Tuple[Pattern, List[str]]:
+        """Compile a pattern -> replacement mapping into one alternation of capture groups.
+        
+        The replacement for a match is ``values[match.lastindex - 1]``.
+        """
+        pattern = re.compile('|'.join(f'({p})' for p in replacements))
+        return pattern, list(replacements.values())
     
     def clean_text(self, text: str) -> str:
         """Clean and normalize product description text."""
@@ -107,33 +141,24 @@ class TextPreprocessor:
                 text = f"{text} {expanded}"
         
         # Apply replacements using configuration
-        for pattern, replacement in self.material_replacements.items():
-            text = re.sub(pattern, replacement, text)
+        text = self._material_pattern.sub(lambda m: self._material_values[m.lastindex - 1], text)
             
-        for pattern, replacement in self.measurement_replacements.items():
-            text = re.sub(pattern, replacement, text)
+        for pattern, replacement in self._measurement_patterns:
+            text = pattern.sub(replacement, text)
             
-        for pattern, replacement in self.state_replacements.items():
-            text = re.sub(pattern, replacement, text)
+        text = self._state_pattern.sub(lambda m: self._state_values[m.lastindex - 1], text)
         
         # Handle special product formats
-        text = re.sub(r'(\d+)\s*k\s*gold', r'\1k-gold', text)     # Gold karat
-        text = re.sub(r'(\d+)\s*v\b', r'\1v', text)               # Voltage
-        text = re.sub(r'(\d+)\s*w\b', r'\1w', text)               # Wattage
-        text = re.sub(r'(\d+)\s*hz\b', r'\1hz', text)             # Frequency
-        text = re.sub(r'(\d+)\s*mm?\b', r'\1mm', text)            # Millimeters
-        text = re.sub(r'(\d+)\s*cm?\b', r'\1cm', text)            # Centimeters
-        text = re.sub(r'(\d+)\s*x\s*(\d+)', r'\1x\2', text)       # Dimensions
+        text = _KARAT_PATTERN.sub(r'\1k-gold', text)              # Gold karat
+        # Voltage, wattage, frequency, millimeters and centimeters in one pass
+        text = _UNIT_PATTERN.sub(lambda m: m.group(1) + _UNIT_SUFFIXES[m.group(2)], text)
+        text = _DIMENSION_PATTERN.sub(r'\1x\2', text)            # Dimensions
         
         # Standardize percentages
-        text = re.sub(r'(\d+)\s*percent\b', r'\1%', text)
-        text = re.sub(r'(\d+)\s*pct\b', r'\1%', text)
+        text = _PERCENT_PATTERN.sub(r'\1%', text)
         
         # Remove special characters but keep hyphens, numbers, %, and basic units
-        text = re.sub(r'[^a-z0-9\s\-%\/]', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        return _DISALLOWED_CHARS_PATTERN.sub(' ', text).strip()
     
     def encode_text(self, texts: List[str]) -> np.ndarray:
         """Encode text descriptions using the embedding service."""
@@ -1,6 +1,7 @@
 """Services module."""
 from .embedding_service import EmbeddingService
-from .gpt_service import GPTValidationService
+from .gpt_service import GPTValidationService, get_gpt_service
 from .cache_service import CacheService
+from .openai_client import get_openai_client
 
-__all__ = ['EmbeddingService', 'GPTValidationService', 'CacheService']
+__all__ = ['EmbeddingService', 'GPTValidationService', 'get_gpt_service', 'CacheService', 'get_openai_client']
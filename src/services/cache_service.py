@@ -1,14 +1,23 @@
 """
 Centralized cache service for embeddings and other data.
 """
+import json
 import pickle
 import hashlib
+import sqlite3
+import threading
+import time
 from pathlib import Path
-from typing import Tuple, Optional, List, Any
+from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 from loguru import logger
 from config.settings import Config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 class CacheService:
     """Centralized service for caching embeddings and other data."""
     
@@ -16,40 +25,113 @@ class CacheService:
         """Initialize cache service."""
         self.cache_dir = Config.CACHE_DIR
         self.cache_dir.mkdir(exist_ok=True)
+        self._score_db = None
+        self._score_db_lock = threading.Lock()
     
     def generate_cache_key(self, data_items: List[str], prefix: str = "main") -> str:
         """Generate consistent cache key from data items."""
         # Create hash from first 100 items to ensure consistency
         sample_data = data_items[:100] if len(data_items) > 100 else data_items
-        data_string = "||".join(sorted(sample_data))
-        data_hash = hashlib.md5(data_string.encode()).hexdigest()[:8]
+        
+        # Stream the items into the digest; same hash as md5("||".join(...)) without building the string
+        digest = hashlib.md5()
+        for i, item in enumerate(sorted(sample_data)):
+            if i:
+                digest.update(b"||")
+            digest.update(item.encode())
+        data_hash = digest.hexdigest()[:8]
         return f"{prefix}_{len(data_items)}_{data_hash}"
     
+    def _cache_paths(self, cache_key: str) -> Tuple[Path, Path]:
+        """Return the embeddings matrix and metadata paths for a cache key."""
+        return (self.cache_dir / f"{cache_key}_embeddings.npy",
+                self.cache_dir / f"{cache_key}_metadata.json")
+    
+    @staticmethod
+    def _read_metadata(metadata_path: Path) -> Dict[str, Any]:
+        """Read a JSON metadata file, using orjson when installed."""
+        if orjson is not None:
+            return orjson.loads(metadata_path.read_bytes())
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _write_metadata(metadata_path: Path, metadata: Dict[str, Any]) -> None:
+        """Write a JSON metadata file, using orjson when installed."""
+        if orjson is not None:
+            metadata_path.write_bytes(orjson.dumps(metadata))
+            return
+        with open(metadata_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+    
     def cache_exists(self, cache_key: str) -> bool:
         """Check if cache file exists."""
-        cache_path = self.cache_dir / f"{cache_key}_embeddings.pkl"
-        return cache_path.exists()
+        embeddings_path, metadata_path = self._cache_paths(cache_key)
+        if embeddings_path.exists() and metadata_path.exists():
+            return True
+        return (self.cache_dir / f"{cache_key}_embeddings.pkl").exists()
     
     def load_embeddings_cache(self, cache_key: str) -> Tuple[Optional[np.ndarray], Optional[List[str]], Optional[List[str]]]:
-        """Load embeddings from cache with consistent key."""
-        cache_path = self.cache_dir / f"{cache_key}_embeddings.pkl"
+        """Load embeddings from cache with consistent key.
+        
+        The embeddings matrix is memory-mapped, so pages are only read as they are used.
+        """
+        embeddings_path, metadata_path = self._cache_paths(cache_key)
+        
+        if not (embeddings_path.exists() and metadata_path.exists()):
+            return self._migrate_legacy_cache(cache_key)
+        
+        try:
+            metadata = self._read_metadata(metadata_path)
+            
+            # Validate cache data structure
+            required_keys = ['descriptions', 'hts_codes']
+            if not all(key in metadata for key in required_keys):
+                logger.warning("Invalid cache data structure, regenerating")
+                return None, None, None
+            
+            embeddings = np.load(embeddings_path, mmap_mode='r', allow_pickle=False)
+            if embeddings.dtype != np.float32:
+                # Caches written at reduced precision would feed rounded vectors to the index
+                logger.warning(f"Cached embeddings stored as {embeddings.dtype}, regenerating")
+                return None, None, None
+            if len(embeddings) != len(metadata['descriptions']):
+                logger.warning("Cached embeddings do not match cached metadata, regenerating")
+                return None, None, None
+            
+            logger.info(f"Loaded embeddings from cache: {len(metadata['descriptions'])} entries")
+            return embeddings, metadata['descriptions'], metadata['hts_codes']
+            
+        except Exception as e:
+            logger.warning(f"Failed to load cache: {str(e)}")
+            return None, None, None
+    
+    def _migrate_legacy_cache(self, cache_key: str) -> Tuple[Optional[np.ndarray], Optional[List[str]], Optional[List[str]]]:
+        """Load a cache written in the old pickle format and rewrite it in the current layout."""
+        legacy_path = self.cache_dir / f"{cache_key}_embeddings.pkl"
         
-        if not cache_path.exists():
-            logger.info(f"Cache file not found: {cache_path}")
+        if not legacy_path.exists():
+            logger.info(f"Cache file not found: {self._cache_paths(cache_key)[0]}")
             return None, None, None
         
         try:
-            with open(cache_path, 'rb') as f:
+            with open(legacy_path, 'rb') as f:
                 cache_data = pickle.load(f)
             
-            # Validate cache data structure
             required_keys = ['embeddings', 'descriptions', 'hts_codes']
             if not all(key in cache_data for key in required_keys):
                 logger.warning("Invalid cache data structure, regenerating")
                 return None, None, None
             
-            logger.info(f"Loaded embeddings from cache: {len(cache_data['descriptions'])} entries")
-            return cache_data['embeddings'], cache_data['descriptions'], cache_data['hts_codes']
+            embeddings = cache_data['embeddings']
+            descriptions = list(cache_data['descriptions'])
+            hts_codes = list(cache_data['hts_codes'])
+            
+            if self.save_embeddings_cache(cache_key, embeddings, descriptions, hts_codes):
+                legacy_path.unlink()
+                logger.info(f"Migrated pickle cache to numpy format: {cache_key}")
+            
+            return np.asarray(embeddings, dtype=np.float32), descriptions, hts_codes
             
         except Exception as e:
             logger.warning(f"Failed to load cache: {str(e)}")
@@ -57,22 +139,25 @@ class CacheService:
     
     def save_embeddings_cache(self, cache_key: str, embeddings: np.ndarray, 
                             descriptions: List[str], hts_codes: List[str]) -> bool:
-        """Save embeddings to cache with metadata."""
-        cache_path = self.cache_dir / f"{cache_key}_embeddings.pkl"
+        """Save embeddings to cache with metadata.
+        
+        Embeddings go to a raw .npy matrix and the descriptions and codes to a
+        JSON file of parallel columns, so loading never unpickles the corpus.
+        """
+        embeddings_path, metadata_path = self._cache_paths(cache_key)
         
         try:
-            cache_data = {
-                'embeddings': embeddings,
-                'descriptions': descriptions,
-                'hts_codes': hts_codes,
-                'version': '1.0',
+            metadata = {
+                'descriptions': list(descriptions),
+                'hts_codes': list(hts_codes),
+                'version': '2.0',
                 'entry_count': len(descriptions)
             }
             
-            with open(cache_path, 'wb') as f:
-                pickle.dump(cache_data, f)
+            np.save(embeddings_path, np.asarray(embeddings, dtype=np.float32), allow_pickle=False)
+            self._write_metadata(metadata_path, metadata)
             
-            logger.info(f"Saved embeddings to cache: {cache_path}")
+            logger.info(f"Saved embeddings to cache: {embeddings_path}")
             return True
             
         except Exception as e:
@@ -82,11 +167,53 @@ class CacheService:
     def clear_cache(self, cache_key: str = None) -> None:
         """Clear specific cache or all caches."""
         if cache_key:
-            cache_path = self.cache_dir / f"{cache_key}_embeddings.pkl"
-            if cache_path.exists():
+            cache_paths = [*self._cache_paths(cache_key), self.cache_dir / f"{cache_key}_embeddings.pkl"]
+            existing = [path for path in cache_paths if path.exists()]
+            for cache_path in existing:
                 cache_path.unlink()
+            if existing:
                 logger.info(f"Cleared cache: {cache_key}")
         else:
-            for cache_file in self.cache_dir.glob("*_embeddings.pkl"):
-                cache_file.unlink()
+            for pattern in ("*_embeddings.npy", "*_metadata.json", "*_embeddings.pkl"):
+                for cache_file in self.cache_dir.glob(pattern):
+                    cache_file.unlink()
             logger.info("Cleared all caches")
+    
+    def _get_score_db(self) -> sqlite3.Connection:
+        """Open the GPT score database on first use."""
+        if self._score_db is None:
+            self._score_db = sqlite3.connect(
+                str(self.cache_dir / Config.GPT_SCORE_CACHE_FILE), check_same_thread=False
+            )
+            self._score_db.execute(
+                "CREATE TABLE IF NOT EXISTS gpt_scores ("
+                "key TEXT PRIMARY KEY, score REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._score_db.commit()
+        return self._score_db
+    
+    def get_gpt_score(self, key: str) -> Optional[float]:
+        """Return a persisted GPT score, or None if missing or older than Config.GPT_SCORE_CACHE_TTL."""
+        try:
+            with self._score_db_lock:
+                row = self._get_score_db().execute(
+                    "SELECT score FROM gpt_scores WHERE key = ? AND created_at >= ?",
+                    (key, time.time() - Config.GPT_SCORE_CACHE_TTL)
+                ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read GPT score cache: {str(e)}")
+            return None
+    
+    def save_gpt_score(self, key: str, score: float) -> None:
+        """Persist a GPT score so later runs can skip the API call."""
+        try:
+            with self._score_db_lock:
+                db = self._get_score_db()
+                db.execute(
+                    "INSERT OR REPLACE INTO gpt_scores (key, score, created_at) VALUES (?, ?, ?)",
+                    (key, float(score), time.time())
+                )
+                db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to save GPT score cache: {str(e)}")
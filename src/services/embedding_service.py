@@ -3,9 +3,10 @@ Embedding service for handling OpenAI embeddings and Pinecone operations.
 """
 import numpy as np
 import time
-from typing import List, Tuple, Optional
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 from pathlib import Path
-from openai import AzureOpenAI, APIError, RateLimitError
+from openai import APIError, RateLimitError
 from pinecone.grpc import PineconeGRPC as Pinecone
 from pinecone import ServerlessSpec
 from loguru import logger
@@ -13,44 +14,77 @@ from loguru import logger
 from config.settings import Config
 from utils.common import exponential_backoff_delay
 from .cache_service import CacheService
+from .openai_client import get_openai_client, embed_texts
+
+def upsert_batches_concurrently(index, batches: Iterable[List[Dict]]) -> None:
+    """Upsert batches concurrently, keeping at most PINECONE_POOL_THREADS in flight.
+    
+    Batches that fail are retried once synchronously; a second failure is raised.
+    """
+    in_flight = deque()
+    failed = []
+    
+    def wait_oldest():
+        batch, future = in_flight.popleft()
+        try:
+            future.result()
+        except Exception as e:
+            logger.warning(f"Pinecone upsert batch failed, will retry: {str(e)}")
+            failed.append(batch)
+    
+    for batch in batches:
+        if len(in_flight) >= Config.PINECONE_POOL_THREADS:
+            wait_oldest()
+        in_flight.append((batch, index.upsert(vectors=batch, async_req=True)))
+    
+    while in_flight:
+        wait_oldest()
+    
+    for batch in failed:
+        index.upsert(vectors=batch)
+    
+    if failed:
+        logger.info(f"Retried {len(failed)} failed Pinecone upsert batches")
 
 class EmbeddingService:
     """Service for handling embeddings and vector operations."""
     
     def __init__(self):
         """Initialize the embedding service."""
-        self.client = AzureOpenAI(
-            api_key=Config.AZURE_OPENAI_API_KEY,
-            api_version=Config.AZURE_OPENAI_API_VERSION,
-            azure_endpoint=Config.AZURE_OPENAI_ENDPOINT
-        )
+        self.client = get_openai_client()
         self.pc = Pinecone(api_key=Config.PINECONE_API_KEY)
         self.index_name = Config.PINECONE_INDEX_NAME
         self.cache_service = CacheService()
+        self._index = None
+        self._cache_key_source = None
+        self._cache_key = None
+    
+    @property
+    def index(self):
+        """Production index handle, opened on first use and reused so queries share its gRPC channel."""
+        if self._index is None:
+            self._index = self.pc.Index(self.index_name)
+        return self._index
     
     def encode_texts(self, texts: List[str]) -> np.ndarray:
         """Encode text descriptions using Azure OpenAI embeddings."""
         try:
-            embeddings = []
-            for i in range(0, len(texts), Config.BATCH_SIZE):
-                batch = texts[i:i + Config.BATCH_SIZE]
-                response = self.client.embeddings.create(
-                    model=Config.AZURE_OPENAI_EMBEDDING_MODEL,
-                    input=batch,
-                    encoding_format="float"
-                )
-                batch_embeddings = [item.embedding for item in response.data]
-                embeddings.extend(batch_embeddings)
-                
-            return np.array(embeddings)
+            return embed_texts(texts)
         except Exception as e:
             logger.error(f"Error encoding text with Azure OpenAI: {str(e)}")
             raise
     
+    def _embeddings_cache_key(self, descriptions: List[str]) -> str:
+        """Cache key for a descriptions sequence, reused while the same sequence is passed again."""
+        if descriptions is not self._cache_key_source:
+            self._cache_key = self.cache_service.generate_cache_key(descriptions, "embeddings")
+            self._cache_key_source = descriptions
+        return self._cache_key
+    
     def get_cached_embeddings(self, descriptions: List[str], hts_codes: List[str]) -> Tuple[Optional[np.ndarray], Optional[List[str]], Optional[List[str]]]:
         """Load embeddings from cache using consistent cache key."""
         # Generate cache key from actual data
-        cache_key = self.cache_service.generate_cache_key(descriptions, "embeddings")
+        cache_key = self._embeddings_cache_key(descriptions)
         
         if self.cache_service.cache_exists(cache_key):
             embeddings, cached_descriptions, cached_codes = self.cache_service.load_embeddings_cache(cache_key)
@@ -68,7 +102,7 @@ class EmbeddingService:
     def save_embeddings_to_cache(self, descriptions: List[str], embeddings: np.ndarray, 
                                 hts_codes: List[str]) -> None:
         """Save embeddings to cache with consistent key."""
-        cache_key = self.cache_service.generate_cache_key(descriptions, "embeddings")
+        cache_key = self._embeddings_cache_key(descriptions)
         self.cache_service.save_embeddings_cache(cache_key, embeddings, descriptions, hts_codes)
     
     def setup_pinecone_index(self, embeddings: np.ndarray, descriptions: List[str], 
@@ -76,7 +110,8 @@ class EmbeddingService:
         """Set up Pinecone index with embeddings for main production data."""
         try:
             # Create index if it doesn't exist (using main production index name)
-            if self.index_name not in self.pc.list_indexes().names():
+            created = self.index_name not in self.pc.list_indexes().names()
+            if created:
                 logger.info("Creating new Pinecone production index...")
                 self.pc.create_index(
                     name=self.index_name,
@@ -88,7 +123,14 @@ class EmbeddingService:
                     )
                 )
             
-            index = self.pc.Index(self.index_name)
+            index = self.index
+            
+            # A freshly created index is known to be empty, so go straight to the bulk load
+            # instead of probing stats on an index that may still be provisioning
+            if created:
+                logger.info("Uploading vectors to Pinecone production index...")
+                self._upload_vectors_to_pinecone(index, embeddings, descriptions, hts_codes)
+                return
             
             # Check if vectors already exist
             stats = index.describe_index_stats()
@@ -105,29 +147,34 @@ class EmbeddingService:
     def _upload_vectors_to_pinecone(self, index, embeddings: np.ndarray, 
                                   descriptions: List[str], hts_codes: List[str]) -> None:
         """Upload vectors to Pinecone in batches."""
-        vectors = []
-        for i, (embedding, description, hts_code) in enumerate(zip(embeddings, descriptions, hts_codes)):
-            vectors.append({
-                'id': str(i),
-                'values': embedding.tolist(),
-                'metadata': {
-                    'description': description,
-                    'hts_code': hts_code
-                }
-            })
-        
-        # Upload in batches
-        for i in range(0, len(vectors), Config.BATCH_SIZE):
-            batch = vectors[i:i + Config.BATCH_SIZE]
-            index.upsert(vectors=batch)
+        upsert_batches_concurrently(index, self._iter_vector_batches(embeddings, descriptions, hts_codes))
         
         logger.info("Successfully uploaded vectors to Pinecone")
     
+    @staticmethod
+    def _iter_vector_batches(embeddings: np.ndarray, descriptions: List[str],
+                             hts_codes: List[str]) -> Iterator[List[Dict]]:
+        """Yield upsert batches, converting only the current slice of embeddings to lists."""
+        total = min(len(embeddings), len(descriptions), len(hts_codes))
+        for start in range(0, total, Config.BATCH_SIZE):
+            end = min(start + Config.BATCH_SIZE, total)
+            values = embeddings[start:end].tolist()
+            yield [
+                {
+                    'id': str(start + offset),
+                    'values': values[offset],
+                    'metadata': {
+                        'description': descriptions[start + offset],
+                        'hts_code': hts_codes[start + offset]
+                    }
+                }
+                for offset in range(end - start)
+            ]
+    
     def search_similar(self, query_embedding: np.ndarray, top_k: int) -> List:
         """Search for similar vectors in Pinecone."""
         try:
-            index = self.pc.Index(self.index_name)
-            return index.query(
+            return self.index.query(
                 vector=query_embedding.tolist(),
                 top_k=top_k,
                 include_metadata=True
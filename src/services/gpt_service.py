@@ -1,25 +1,173 @@
 """
 GPT service for HTS code validation and confidence scoring.
 """
-import time
+import asyncio
+import hashlib
+import json
+import threading
 import re
-from typing import Dict
-from openai import AzureOpenAI, APIError, RateLimitError
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from openai import APIError
 from loguru import logger
 
 from config.settings import Config
-from utils.common import exponential_backoff_delay
+from services.openai_client import (
+    AsyncOpenAIRouter, create_chat_completion, estimate_request_tokens, get_openai_client, truncate_to_tokens
+)
+from services.cache_service import CacheService
+
+# Confidence score formats, tried in order, compiled once at import.
+# The bare-number form is what the model returns almost every time; it cannot co-occur
+# with the keyword or percent forms, so checking it first short-circuits the common case
+# without changing which number wins.
+_CONFIDENCE_PATTERNS = [
+    re.compile(r'^(\d+(?:\.\d+)?)$'),                                # Just "95" or "95.0"
+    re.compile(r'confidence[:\s]*(\d+(?:\.\d+)?)', re.IGNORECASE),  # "Confidence: 95" or "Confidence 95"
+    re.compile(r'score[:\s]*(\d+(?:\.\d+)?)', re.IGNORECASE),       # "Score: 95" or "Score 95"
+    re.compile(r'(\d+(?:\.\d+)?)\s*%'),                              # "95%"
+    re.compile(r'(\d+(?:\.\d+)?)')                                   # Any number in the text (fallback)
+]
+
+# A number followed by something that cannot continue it, i.e. the score is fully streamed
+_COMPLETE_SCORE_PATTERN = re.compile(r'\d+(?:\.\d+)?[^\d.]')
+
+# Instructions shared by every validation request. Keeping them in an identical system
+# message (rather than repeating them in each user prompt) lets the provider reuse the
+# cached prefix; only the candidate-specific fields go in the user message.
+_SYSTEM_PROMPT_BODY = """You are an expert US HTS classification system for a company that designs and manufactures electrical transformers, reactors, and bushings, as well as related parts and subcomponents, with experience in electrical components and related subassemblies. Analyze product descriptions and HTS codes, then return only a confidence score between 0-100.
+
+Instructions:
+
+1. **Product Specificity:**  
+   - Assess how closely the HTS description matches the product details, **paying special attention to critical values such as voltage and power rating (e.g., kVA, kW, volts)**, as these frequently determine the correct subheading.
+2. **Category Alignment:**  
+   - Determine if this chapter/heading is appropriate for the product type.
+3. **Material & Characteristics:**  
+   - Check if the described materials and product characteristics, **including any specified electrical ratings (e.g., voltage, kVA, insulation class, frequency)**, align.
+4. **Usage/Purpose:**  
+   - Evaluate if the product's intended function fits the HTS code's intended use.
+
+**Scoring:**  
+Return only a single number between 0 and 100, representing your confidence in this classification match.  
+Example confidence scores:
+- 95-100: Perfect match with exact terminology and use
+- 80-94: Very good match, minor differences only
+- 60-79: Good match, but details differ or lack evidence
+- 40-59: Partial match, significant differences
+- 0-39: Poor match or wrong category
+
+**Important Category Guidelines (for reference):**
+- Electric transformers are generally classified in Chapter 85, heading 8504.21, **with subheadings often based on voltage and kVA ratings**. unless specified as a **part**, any description of a transformer should be treated as a **complete unit**.
+- The stated voltage or kVA rating in the description is defined as **exactly that**, and **not exceeding** that value
+- **If the power handling capacity (such as kVA, kW, or similar) in the product description does not exactly match the value stated in the HTS code description from the context, return only the subheading (the first 6-8 digits) as the code.**
+- Bushings and similar insulating fittings often fall under 8546.20.
+- Air core reactors fall within 8504.90, but review product specifics, especially electrical ratings.
+- Electrical parts and subassemblies should be considered for headings 8504, 8546, or other relevant chapters, depending on their function and electrical properties.
+
+**Additional Critical Instructions:**
+- If you are not sure about the subheading (the 5th and 6th or 7th and 8th digits), or if there is insufficient evidence for a specific sub-classification (such as missing voltage or kVA rating), return only the preceding digits (e.g., "8504" or "8504.21") as the code.
+- If your confidence score is below 80, or if the match is not strong, return the parent heading (the first 4 digits) to avoid over-specific classification.
+- Be critical and conservative. When in doubt, prefer a broader heading to avoid misclassification.
+
+"""
+_SYSTEM_PROMPT = _SYSTEM_PROMPT_BODY + """**Format:**
+Return only the confidence score (0-100)."""
+
+# Single-candidate instructions when Config.GPT_STRUCTURED_OUTPUT requests a JSON reply
+_STRUCTURED_SYSTEM_PROMPT = _SYSTEM_PROMPT_BODY + """**Format:**
+Return only JSON of the form {"confidence": N}, where N is the confidence score (0-100)."""
+
+# Same instructions for scoring several numbered candidates in one request
+_MULTI_SYSTEM_PROMPT = _SYSTEM_PROMPT_BODY + """**Format:**
+Score each numbered candidate independently and return only a JSON array of integer confidence scores (0-100), one per candidate, in the same order."""
+
+# Static framing of the per-candidate user message; only the candidate section varies
+_PROMPT_HEAD = "Please validate the following proposed HTS code classification.\n\n"
+_PROMPT_TAIL = "\nReturn only the confidence score (0-100).\n"
+_STRUCTURED_PROMPT_TAIL = "\nReturn only JSON {\"confidence\": N} with N the confidence score (0-100).\n"
+
+# Structured output schema for single-candidate replies; see _parse_score_json
+_SCORE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "confidence_score",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"confidence": {"type": "integer"}},
+            "required": ["confidence"],
+            "additionalProperties": False
+        }
+    }
+}
+_MULTI_PROMPT_HEAD = "Please validate each of the following proposed HTS code classifications.\n\n"
+
+# JSON array in a multi-candidate reply, tolerating surrounding text or code fences
+_SCORE_ARRAY_PATTERN = re.compile(r'\[[^\[\]]*\]')
+
+# Category adjustments: (keywords that must all appear in the description, heading that
+# confirms the category, chapter outside of which the candidate is capped)
+_CATEGORY_RULES = (
+    (frozenset(('wallet', 'leather')), '4202', '42'),
+    (frozenset(('window frame', 'aluminum')), '7610', '76'),
+)
+
+# Every rule keyword in one alternation, so a description is scanned once however many rules exist
+_CATEGORY_KEYWORD_PATTERN = re.compile('|'.join(
+    re.escape(keyword)
+    for keyword in sorted({kw for keywords, _, _ in _CATEGORY_RULES for kw in keywords}, key=len, reverse=True)
+))
+
+def _clamp_score(score: float) -> float:
+    """Clamp a confidence score to 0-100 without the min/max call overhead."""
+    return 0.0 if score < 0.0 else 100.0 if score > 100.0 else score
+
+def _candidate_fields(hts_info: Dict) -> Tuple[str, str]:
+    """
+    Duty rate and units of a candidate as they appear in prompts.
+    
+    Candidates from the HTS data loader carry these pre-rendered; hand-built candidates
+    are formatted on the fly.
+    """
+    rate = hts_info.get('general_rate_str')
+    if rate is None:
+        rate = str(hts_info.get('general_rate', 'N/A') or 'N/A')
+    units = hts_info.get('units_str')
+    if units is None:
+        units = ', '.join(hts_info['units']) if hts_info.get('units') else 'N/A'
+    return rate, units
+
+@lru_cache(maxsize=4096)
+def _matching_category_rule(description: str) -> Optional[Tuple[FrozenSet[str], str, str]]:
+    """
+    Return the first category rule whose keywords all appear in the description (wallet before window frame).
+    
+    Memoized because every candidate of a description asks during adjustment, so the
+    description is lowered and scanned once.
+    """
+    found_keywords = set(_CATEGORY_KEYWORD_PATTERN.findall(description.lower()))
+    if not found_keywords:
+        return None
+    for rule in _CATEGORY_RULES:
+        if rule[0] <= found_keywords:
+            return rule
+    return None
 
 class GPTValidationService:
     """Service for GPT-based HTS validation."""
     
     def __init__(self):
         """Initialize the GPT service."""
-        self.client = AzureOpenAI(
-            api_key=Config.AZURE_OPENAI_API_KEY,
-            api_version=Config.AZURE_OPENAI_API_VERSION,
-            azure_endpoint=Config.AZURE_OPENAI_ENDPOINT
-        )
+        self.client = get_openai_client()
+        
+        # Raw GPT confidences keyed by (description, candidate); see _response_cache_key
+        self._response_cache = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+        
+        # Scores persisted across runs, keyed by the exact request
+        self.score_cache = CacheService()
     
     def validate_hts_match(self, product_description: str, hts_info: Dict, 
                           chapter_context: str = "") -> float:
@@ -34,53 +182,308 @@ class GPTValidationService:
         Returns:
             Confidence score (0-100)
         """
-        retry_count = 0
+        cache_key = self._response_cache_key(product_description, hts_info, chapter_context)
+        cached_confidence = self._get_cached_confidence(cache_key)
+        if cached_confidence is not None:
+            return self._adjust_confidence(cached_confidence, product_description, hts_info)
+        
+        prompt = self._build_validation_prompt(
+            product_description, hts_info, chapter_context
+        )
+        request = self._completion_kwargs(prompt)
+        
+        score_key = self._score_cache_key(request)
+        stored_confidence = self.score_cache.get_gpt_score(score_key)
+        if stored_confidence is not None:
+            self._cache_confidence(cache_key, stored_confidence)
+            return self._adjust_confidence(stored_confidence, product_description, hts_info)
+        
+        try:
+            stream = create_chat_completion(**request)
+            
+            confidence = self._parse_score_json(self._read_stream(stream))
+            self._cache_confidence(cache_key, confidence)
+            self.score_cache.save_gpt_score(score_key, confidence)
+            return self._adjust_confidence(confidence, product_description, hts_info)
+            
+        except (APIError, ValueError) as e:
+            logger.opt(lazy=True).error("GPT validation error: {}", lambda: str(e))
+            return 50.0
+    
+    def validate_hts_matches(self, items: List[Tuple[str, Dict, str]]) -> List[float]:
+        """
+        Validate several HTS candidates.
         
-        while retry_count < Config.MAX_RETRIES:
+        Uncached candidates are scored together in a single GPT request; if that reply
+        cannot be used, each candidate is validated with its own request, sent concurrently.
+        
+        Args:
+            items: (product_description, hts_info, chapter_context) tuples
+            
+        Returns:
+            Confidence scores (0-100), in the same order as items
+        """
+        if len(items) > 1:
+            confidences = self._score_hts_matches(items)
+            if confidences is not None:
+                return confidences
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.validate_hts_match_batch(items))
+        
+        # Already inside an event loop (asyncio.run cannot nest), so validate one at a time
+        return [self.validate_hts_match(*item) for item in items]
+    
+    def _score_hts_matches(self, items: List[Tuple[str, Dict, str]]) -> Optional[List[float]]:
+        """
+        Score candidates with one multi-candidate GPT request.
+        
+        Args:
+            items: (product_description, hts_info, chapter_context) tuples
+            
+        Returns:
+            Adjusted confidence scores in item order, or None if the reply could not be parsed
+        """
+        cache_keys = [self._response_cache_key(*item) for item in items]
+        sections = [self._build_candidate_section(*item) for item in items]
+        score_keys = [self._score_cache_key(self._multi_completion_kwargs([section])) for section in sections]
+        
+        confidences = []
+        pending = []
+        for index, (cache_key, score_key) in enumerate(zip(cache_keys, score_keys)):
+            confidence = self._get_cached_confidence(cache_key)
+            if confidence is None:
+                confidence = self.score_cache.get_gpt_score(score_key)
+                if confidence is not None:
+                    self._cache_confidence(cache_key, confidence)
+            if confidence is None:
+                pending.append(index)
+            confidences.append(confidence)
+        
+        if pending:
+            request = self._multi_completion_kwargs([sections[index] for index in pending])
+            if estimate_request_tokens(request) > Config.GPT_MAX_INPUT_TOKENS:
+                logger.warning(f"Multi-candidate prompt for {len(pending)} candidates exceeds "
+                               f"{Config.GPT_MAX_INPUT_TOKENS} tokens, validating individually")
+                return None
+            
             try:
-                prompt = self._build_validation_prompt(
-                    product_description, hts_info, chapter_context
-                )
-                
-                response = self.client.chat.completions.create(
-                    model=Config.AZURE_OPENAI_CHAT_MODEL,
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": "You are an expert US HTS classification system for a company that designs and manufactures electrical transformers, reactors, and bushings, as well as related parts and subcomponents. Analyze product descriptions and HTS codes, then return only a confidence score between 0-100."
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.0,
-                    max_tokens=10
-                )
-                
-                # Robust parsing for different response formats
-                response_text = response.choices[0].message.content.strip()
-                confidence = self._parse_confidence_score(response_text)
-                
-                # Apply category-specific adjustments
-                adjusted_confidence = self._apply_category_adjustments(
-                    confidence, product_description, hts_info['hts_code']
-                )
-                
-                return min(max(adjusted_confidence, 0), 100)
-                
-            except RateLimitError:
-                retry_count += 1
-                if retry_count < Config.MAX_RETRIES:
-                    delay = exponential_backoff_delay(retry_count, Config.BASE_DELAY)
-                    logger.warning(f"Rate limit hit, retrying in {delay} seconds...")
-                    time.sleep(delay)
-                else:
-                    logger.error("Max retries reached for rate limit")
-                    return 50.0
-                    
+                response = create_chat_completion(**request)
+                scores = self._parse_score_array(response.choices[0].message.content, len(pending))
             except (APIError, ValueError) as e:
-                logger.error(f"GPT validation error: {str(e)}")
-                return 50.0
+                logger.warning(f"Multi-candidate GPT scoring failed, validating individually: {str(e)}")
+                return None
+            
+            for index, score in zip(pending, scores):
+                confidences[index] = score
+                self._cache_confidence(cache_keys[index], score)
+                self.score_cache.save_gpt_score(score_keys[index], score)
+        
+        return [
+            self._adjust_confidence(confidence, product_description, hts_info)
+            for confidence, (product_description, hts_info, _) in zip(confidences, items)
+        ]
+    
+    async def validate_hts_match_batch(self, items: List[Tuple[str, Dict, str]]) -> List[float]:
+        """
+        Validate several HTS candidates concurrently, bounded by Config.GPT_MAX_CONCURRENCY.
+        
+        Args:
+            items: (product_description, hts_info, chapter_context) tuples
+            
+        Returns:
+            Confidence scores (0-100), in the same order as items
+        """
+        if not items:
+            return []
+        
+        semaphore = asyncio.Semaphore(Config.GPT_MAX_CONCURRENCY)
+        
+        async with AsyncOpenAIRouter() as router:
+            async def bounded(item):
+                async with semaphore:
+                    return await self._validate_hts_match_async(router, *item)
+            
+            return list(await asyncio.gather(*(bounded(item) for item in items)))
+    
+    async def _validate_hts_match_async(self, router: AsyncOpenAIRouter, product_description: str, hts_info: Dict,
+                                        chapter_context: str = "") -> float:
+        """Async counterpart of validate_hts_match sending its request through the given router."""
+        cache_key = self._response_cache_key(product_description, hts_info, chapter_context)
+        cached_confidence = self._get_cached_confidence(cache_key)
+        if cached_confidence is not None:
+            return self._adjust_confidence(cached_confidence, product_description, hts_info)
+        
+        try:
+            prompt = self._build_validation_prompt(
+                product_description, hts_info, chapter_context
+            )
+            request = self._completion_kwargs(prompt)
+            
+            score_key = self._score_cache_key(request)
+            stored_confidence = self.score_cache.get_gpt_score(score_key)
+            if stored_confidence is not None:
+                self._cache_confidence(cache_key, stored_confidence)
+                return self._adjust_confidence(stored_confidence, product_description, hts_info)
+            
+            stream = await router.create_chat_completion(**request)
+            
+            confidence = self._parse_score_json(await self._read_stream_async(stream))
+            self._cache_confidence(cache_key, confidence)
+            self.score_cache.save_gpt_score(score_key, confidence)
+            return self._adjust_confidence(confidence, product_description, hts_info)
+            
+        except (APIError, ValueError) as e:
+            logger.opt(lazy=True).error("GPT validation error: {}", lambda: str(e))
+            return 50.0
+    
+    def _completion_kwargs(self, prompt: str) -> Dict:
+        """Build the chat completion request arguments for a validation prompt."""
+        if Config.GPT_STRUCTURED_OUTPUT:
+            return {
+                'model': Config.AZURE_OPENAI_CHAT_MODEL,
+                'messages': [
+                    {"role": "system", "content": _STRUCTURED_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                'temperature': 0.0,
+                'max_tokens': 10,  # {"confidence": 100} is about seven tokens
+                'response_format': _SCORE_RESPONSE_FORMAT,
+                'stream': True  # read with _read_stream so we can stop once the score is complete
+            }
+        return {
+            'model': Config.AZURE_OPENAI_CHAT_MODEL,
+            'messages': [
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.0,
+            'max_tokens': 4,  # a 0-100 score fits in three tokens
+            'stop': ["\n"],
+            'stream': True  # read with _read_stream so we can stop once the score is complete
+        }
+    
+    def _multi_completion_kwargs(self, sections: List[str]) -> Dict:
+        """Build the chat completion request scoring several candidate sections at once."""
+        prompt = _MULTI_PROMPT_HEAD + "".join(
+            f"Candidate {number}:\n{section}" for number, section in enumerate(sections, 1)
+        ) + f"\nReturn a JSON array of {len(sections)} confidence scores (0-100), in candidate order.\n"
+        return {
+            'model': Config.AZURE_OPENAI_CHAT_MODEL,
+            'messages': [
+                {"role": "system", "content": _MULTI_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.0,
+            'max_tokens': 4 * len(sections) + 8
+        }
+    
+    @staticmethod
+    def _parse_score_array(response_text: str, expected: int) -> List[float]:
+        """
+        Parse a JSON array of confidence scores.
         
-        return 50.0
+        Raises:
+            ValueError: If the reply holds no array of ``expected`` numbers
+        """
+        match = _SCORE_ARRAY_PATTERN.search(response_text or "")
+        if not match:
+            raise ValueError(f"No score array in response: '{response_text}'")
+        scores = json.loads(match.group(0))
+        if len(scores) != expected or not all(isinstance(score, (int, float)) for score in scores):
+            raise ValueError(f"Expected {expected} numeric scores, got: '{response_text}'")
+        return [_clamp_score(float(score)) for score in scores]
+    
+    @staticmethod
+    def _read_stream(stream) -> str:
+        """Accumulate a streamed completion, closing it as soon as a complete score has arrived."""
+        text = ""
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text += chunk.choices[0].delta.content
+                    if _COMPLETE_SCORE_PATTERN.search(text):
+                        break
+        finally:
+            stream.close()
+        return text
+    
+    @staticmethod
+    async def _read_stream_async(stream) -> str:
+        """Async counterpart of _read_stream."""
+        text = ""
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text += chunk.choices[0].delta.content
+                    if _COMPLETE_SCORE_PATTERN.search(text):
+                        break
+        finally:
+            await stream.close()
+        return text
+    
+    def _adjust_confidence(self, confidence: float, product_description: str, hts_info: Dict) -> float:
+        """
+        Apply category-specific adjustments to a raw score.
+        
+        Raw scores are clamped to 0-100 when parsed and the adjustments only move them to
+        90 or 30, so the result needs no second clamp.
+        """
+        return self._apply_category_adjustments(confidence, product_description, hts_info['hts_code'])
+    
+    @staticmethod
+    def _response_cache_key(product_description: str, hts_info: Dict, chapter_context: str) -> Tuple:
+        """
+        Key a validation by normalized description and candidate.
+        
+        The candidate's prompt fields (official description, duty rate, units) are folded
+        into a short digest so repeated candidates stay cheap to store.
+        """
+        description_norm = " ".join(product_description.lower().split())
+        candidate_fields = "|".join([str(hts_info.get('description', '')), *_candidate_fields(hts_info)])
+        candidate_digest = hashlib.blake2b(candidate_fields.encode(), digest_size=8).hexdigest()
+        return (description_norm, hts_info['hts_code'], candidate_digest, chapter_context)
+    
+    @staticmethod
+    def _score_cache_key(request: Dict) -> str:
+        """Key a persisted score by model and the exact messages sent."""
+        parts = [request['model']] + [message['content'] for message in request['messages']]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+    
+    def _get_cached_confidence(self, cache_key: Tuple) -> Optional[float]:
+        """Return a cached raw confidence and mark it most recently used."""
+        with self._response_cache_lock:
+            confidence = self._response_cache.get(cache_key)
+            if confidence is not None:
+                self._response_cache.move_to_end(cache_key)
+            return confidence
+    
+    def _cache_confidence(self, cache_key: Tuple, confidence: float) -> None:
+        """Store a raw confidence, evicting the least recently used beyond Config.GPT_RESPONSE_CACHE_SIZE."""
+        with self._response_cache_lock:
+            self._response_cache[cache_key] = confidence
+            self._response_cache.move_to_end(cache_key)
+            while len(self._response_cache) > Config.GPT_RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+    
+    def cache_clear(self) -> None:
+        """Drop all cached GPT confidences."""
+        with self._response_cache_lock:
+            self._response_cache.clear()
+    
+    def _parse_score_json(self, response_text: str) -> float:
+        """
+        Parse a structured {"confidence": N} reply.
+        
+        Falls back to _parse_confidence_score for free-text replies, e.g. when
+        Config.GPT_STRUCTURED_OUTPUT is off or the stream was closed before the closing brace.
+        """
+        try:
+            return _clamp_score(float(json.loads(response_text)["confidence"]))
+        except (ValueError, KeyError, TypeError):
+            return self._parse_confidence_score(response_text)
     
     def _parse_confidence_score(self, response_text: str) -> float:
         """
@@ -97,105 +500,82 @@ class GPTValidationService:
             response_text = response_text.strip()
             
             # Try multiple patterns to extract confidence score
-            patterns = [
-                r'confidence[:\s]*(\d+(?:\.\d+)?)',  # "Confidence: 95" or "Confidence 95"
-                r'score[:\s]*(\d+(?:\.\d+)?)',       # "Score: 95" or "Score 95"
-                r'(\d+(?:\.\d+)?)\s*%',              # "95%"
-                r'^(\d+(?:\.\d+)?)$',                # Just "95" or "95.0"
-                r'(\d+(?:\.\d+)?)'                   # Any number in the text (fallback)
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, response_text, re.IGNORECASE)
+            for pattern in _CONFIDENCE_PATTERNS:
+                match = pattern.search(response_text)
                 if match:
                     score = float(match.group(1))
                     # Ensure score is within valid range
-                    return min(max(score, 0.0), 100.0)
+                    return _clamp_score(score)
             
             # If no pattern matches, log the response and return default
-            logger.warning(f"Could not parse confidence score from response: '{response_text}'")
+            # Lazy: the message is only built if a sink accepts warnings
+            logger.opt(lazy=True).warning("Could not parse confidence score from response: '{}'",
+                                          lambda: response_text)
             return 50.0
             
         except (ValueError, AttributeError) as e:
-            logger.error(f"Error parsing confidence score from '{response_text}': {e}")
+            logger.opt(lazy=True).error("Error parsing confidence score from '{}': {}",
+                                        lambda: response_text, lambda: e)
             return 50.0
     
     def _build_validation_prompt(self, product_description: str, hts_info: Dict, 
                                chapter_context: str) -> str:
-        """Build the validation prompt for GPT."""
-        general_rate = hts_info.get('general_rate', 'N/A') or 'N/A'
+        """Build the per-candidate part of the validation prompt; the static instructions live in _SYSTEM_PROMPT."""
+        return "".join([
+            _PROMPT_HEAD,
+            self._build_candidate_section(product_description, hts_info, chapter_context),
+            _STRUCTURED_PROMPT_TAIL if Config.GPT_STRUCTURED_OUTPUT else _PROMPT_TAIL
+        ])
+    
+    @staticmethod
+    def _build_candidate_section(product_description: str, hts_info: Dict, chapter_context: str) -> str:
+        """Render one product description and candidate HTS code for a validation prompt."""
+        # Bound oversized descriptions so the request cannot overrun the model's context window
+        description = truncate_to_tokens(product_description, Config.GPT_MAX_DESCRIPTION_TOKENS)
+        if description is not product_description:
+            logger.warning(f"Truncated product description to {Config.GPT_MAX_DESCRIPTION_TOKENS} tokens for GPT validation")
+        
+        general_rate, units = _candidate_fields(hts_info)
         context_info = f"\nProduct Category: {chapter_context}" if chapter_context else ""
         
-        return f"""You are an expert in US Harmonized Tariff Schedule (HTS) classification with experience in electrical components, transformers, bushings, reactors, and related subassemblies.
-
-Please validate the following proposed HTS code classification.
-
----
-Product Description:
-{product_description}
-{context_info}
-
-Candidate HTS Classification:
-- Code: {hts_info['hts_code']}
-- Official Description: {hts_info['description']}
-- Duty Rate: {general_rate}
-- Units of Measurement: {', '.join(hts_info.get('units', [])) if hts_info.get('units') else 'N/A'}
----
-
-Instructions:
-
-1. **Product Specificity:**  
-   - Assess how closely the HTS description matches the product details, **paying special attention to critical values such as voltage and power rating (e.g., kVA, kW, volts)**, as these frequently determine the correct subheading.
-2. **Category Alignment:**  
-   - Determine if this chapter/heading is appropriate for the product type.
-3. **Material & Characteristics:**  
-   - Check if the described materials and product characteristics, **including any specified electrical ratings (e.g., voltage, kVA, insulation class, frequency)**, align.
-4. **Usage/Purpose:**  
-   - Evaluate if the product's intended function fits the HTS code's intended use.
-
-**Scoring:**  
-Return only a single number between 0 and 100, representing your confidence in this classification match.  
-Example confidence scores:
-- 95-100: Perfect match with exact terminology and use
-- 80-94: Very good match, minor differences only
-- 60-79: Good match, but details differ or lack evidence
-- 40-59: Partial match, significant differences
-- 0-39: Poor match or wrong category
-
-**Important Category Guidelines (for reference):**
-- Electric transformers are generally classified in Chapter 85, heading 8504.21, **with subheadings often based on voltage and kVA ratings**. unless specified as a **part**, any description of a transformer should be treated as a **complete unit**.
-- The stated voltage or kVA rating in the description is defined as **exactly that**, and **not exceeding** that value
-- **If the power handling capacity (such as kVA, kW, or similar) in the product description does not exactly match the value stated in the HTS code description from the context, return only the subheading (the first 6-8 digits) as the code.**
-- Bushings and similar insulating fittings often fall under 8546.20.
-- Air core reactors fall within 8504.90, but review product specifics, especially electrical ratings.
-- Electrical parts and subassemblies should be considered for headings 8504, 8546, or other relevant chapters, depending on their function and electrical properties.
-
-**Additional Critical Instructions:**
-- If you are not sure about the subheading (the 5th and 6th or 7th and 8th digits), or if there is insufficient evidence for a specific sub-classification (such as missing voltage or kVA rating), return only the preceding digits (e.g., "8504" or "8504.21") as the code.
-- If your confidence score is below 80, or if the match is not strong, return the parent heading (the first 4 digits) to avoid over-specific classification.
-- Be critical and conservative. When in doubt, prefer a broader heading to avoid misclassification.
-
-**Format:**
-Return only the confidence score (0-100).
-"""
+        return "".join([
+            "---\nProduct Description:\n",
+            description, "\n", context_info,
+            "\n\nCandidate HTS Classification:\n- Code: ", hts_info['hts_code'],
+            "\n- Official Description: ", str(hts_info['description']),
+            "\n- Duty Rate: ", general_rate,
+            "\n- Units of Measurement: ", units,
+            "\n---\n"
+        ])
 
     
     def _apply_category_adjustments(self, confidence: float, description: str, hts_code: str) -> float:
         """Apply category-specific confidence adjustments."""
-        desc_lower = description.lower()
-        
-        # Wallet adjustments
-        if 'wallet' in desc_lower and 'leather' in desc_lower:
-            if hts_code.startswith('4202'):
-                confidence = max(confidence, 90)
-            elif not hts_code.startswith('42'):
-                confidence = min(confidence, 30)
-        
-        # Window frame adjustments
-        elif 'window frame' in desc_lower and 'aluminum' in desc_lower:
-            if hts_code.startswith('7610'):
-                confidence = max(confidence, 90)
-            elif not hts_code.startswith('76'):
-                confidence = min(confidence, 30)
-        
-        return confidence
\ No newline at end of file
+        rule = _matching_category_rule(description)
+        if rule is None:
+            return confidence
+        
+        _, heading, chapter = rule
+        if hts_code.startswith(heading):
+            confidence = confidence if confidence > 90 else 90.0
+        elif not hts_code.startswith(chapter):
+            confidence = confidence if confidence < 30 else 30.0
+        
+        return confidence
+
+_gpt_service: Optional[GPTValidationService] = None
+_gpt_service_lock = threading.Lock()
+
+def get_gpt_service() -> GPTValidationService:
+    """
+    Return the process-wide GPT validation service, creating it on first use.
+    
+    Sharing one instance keeps its response cache and score store warm across
+    classifiers instead of starting cold for every new classifier.
+    """
+    global _gpt_service
+    if _gpt_service is None:
+        with _gpt_service_lock:
+            if _gpt_service is None:
+                _gpt_service = GPTValidationService()
+    return _gpt_service
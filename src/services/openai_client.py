@@ -0,0 +1,319 @@
+"""
+Shared Azure OpenAI clients for the HTS Classification System.
+
+Requests are routed across the primary deployment and any configured failover
+deployments, each with its own rate limits.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+from openai import APIConnectionError, AsyncAzureOpenAI, AzureOpenAI, InternalServerError, RateLimitError
+from loguru import logger
+
+from config.settings import Config
+from utils.common import TokenBucketRateLimiter
+
+try:
+    import tiktoken
+    _TOKEN_ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _TOKEN_ENCODING = None
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# Failures that another deployment may not share; anything else is raised immediately
+_FAILOVER_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+def _http_limits() -> httpx.Limits:
+    """Connection pool limits shared by the sync and async clients."""
+    return httpx.Limits(
+        max_connections=Config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS
+    )
+
+def _model_quota(model: str) -> Tuple[int, int]:
+    """Requests and tokens per minute allowed for a model's deployment on one endpoint."""
+    if model == Config.AZURE_OPENAI_EMBEDDING_MODEL:
+        return Config.OPENAI_EMBEDDING_MAX_REQUESTS_PER_MINUTE, Config.OPENAI_EMBEDDING_MAX_TOKENS_PER_MINUTE
+    return Config.OPENAI_CHAT_MAX_REQUESTS_PER_MINUTE, Config.OPENAI_CHAT_MAX_TOKENS_PER_MINUTE
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the Retry-After header from an API error, if present."""
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+class _Deployment:
+    """An Azure OpenAI resource with its own quota, client and cooldown state."""
+    
+    def __init__(self, endpoint: str, api_key: str):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        # One budget per model, as Azure sets quotas per model deployment
+        self._limiters: Dict[str, TokenBucketRateLimiter] = {}
+        self._limiters_lock = threading.Lock()
+        self.cooling_until = 0.0
+        self._client: Optional[AzureOpenAI] = None
+        self._client_lock = threading.Lock()
+    
+    def limiter(self, model: str) -> TokenBucketRateLimiter:
+        """Rate limiter of the model's deployment on this endpoint, created on first use."""
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            with self._limiters_lock:
+                limiter = self._limiters.get(model)
+                if limiter is None:
+                    limiter = TokenBucketRateLimiter(*_model_quota(model))
+                    self._limiters[model] = limiter
+        return limiter
+    
+    def client_options(self) -> dict:
+        """
+        Options shared by this deployment's sync and async clients.
+        
+        Bounded timeouts keep a stalled connection from blocking a worker indefinitely, and
+        the SDK retries 429/5xx responses (honouring Retry-After) up to Config.MAX_RETRIES times.
+        """
+        return {
+            'api_key': self.api_key,
+            'api_version': Config.AZURE_OPENAI_API_VERSION,
+            'azure_endpoint': self.endpoint,
+            'timeout': httpx.Timeout(
+                connect=Config.OPENAI_CONNECT_TIMEOUT,
+                read=Config.OPENAI_READ_TIMEOUT,
+                write=Config.OPENAI_WRITE_TIMEOUT,
+                pool=Config.OPENAI_POOL_TIMEOUT
+            ),
+            'max_retries': Config.MAX_RETRIES
+        }
+    
+    @property
+    def client(self) -> AzureOpenAI:
+        """This deployment's sync client, created on first use and shared by every caller."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = AzureOpenAI(
+                        **self.client_options(),
+                        http_client=httpx.Client(limits=_http_limits(), http2=_HTTP2_AVAILABLE)
+                    )
+        return self._client
+    
+    def cool_down(self, error: Exception) -> None:
+        """Skip this deployment until its Retry-After (or Config.OPENAI_DEPLOYMENT_COOLDOWN) passes."""
+        delay = _retry_after_seconds(error) or Config.OPENAI_DEPLOYMENT_COOLDOWN
+        self.cooling_until = time.monotonic() + delay
+        logger.warning(f"OpenAI deployment {self.endpoint} unavailable ({type(error).__name__}), "
+                       f"routing elsewhere for {delay} seconds")
+
+_deployments: Optional[List[_Deployment]] = None
+_deployments_lock = threading.Lock()
+
+def _get_deployments() -> List[_Deployment]:
+    """The primary deployment followed by any configured failover deployments."""
+    global _deployments
+    if _deployments is None:
+        with _deployments_lock:
+            if _deployments is None:
+                endpoints = [Config.AZURE_OPENAI_ENDPOINT] + Config.AZURE_OPENAI_FAILOVER_ENDPOINTS
+                api_keys = [Config.AZURE_OPENAI_API_KEY] + Config.AZURE_OPENAI_FAILOVER_API_KEYS
+                _deployments = [
+                    _Deployment(endpoint, api_keys[i] if i < len(api_keys) else Config.AZURE_OPENAI_API_KEY)
+                    for i, endpoint in enumerate(endpoints)
+                ]
+    return _deployments
+
+def _routing_order(model: str) -> List[_Deployment]:
+    """
+    Deployments in the order to try them for a model.
+    
+    Deployments not cooling down come first, most remaining token budget for the model first; cooling
+    deployments follow, soonest recovery first, so a request always has somewhere to go.
+    """
+    now = time.monotonic()
+    deployments = _get_deployments()
+    ready = [d for d in deployments if d.cooling_until <= now]
+    cooling = [d for d in deployments if d.cooling_until > now]
+    ready.sort(key=lambda d: d.limiter(model).available_tokens(), reverse=True)
+    cooling.sort(key=lambda d: d.cooling_until)
+    return ready + cooling
+
+def get_openai_client() -> AzureOpenAI:
+    """
+    Return the process-wide Azure OpenAI client of the primary deployment.
+    
+    Sharing one client lets every service reuse the same HTTP connection pool
+    instead of paying a new TLS handshake per service instance. The pool uses
+    HTTP/2 when the optional ``h2`` package is installed, so concurrent requests
+    multiplex over one connection. Prefer create_chat_completion/create_embeddings,
+    which also route across failover deployments.
+    """
+    return _get_deployments()[0].client
+
+def estimate_request_tokens(request: dict) -> int:
+    """Estimate the tokens a chat or embedding request counts against the quota."""
+    if 'messages' in request:
+        tokens = sum(count_tokens(message['content']) for message in request['messages'])
+    else:
+        texts = request.get('input', [])
+        tokens = count_tokens(texts) if isinstance(texts, str) else sum(count_tokens(text) for text in texts)
+    return tokens + request.get('max_tokens', 0)
+
+def _call_routed(endpoint: Callable[[AzureOpenAI], Callable[..., Any]], request: dict) -> Any:
+    """
+    Send a request to the healthiest deployment, failing over on rate limits and outages.
+    
+    Each attempt waits for that deployment's request and token budget. Every deployment but
+    the last is called without SDK retries so a 429 moves on at once instead of backing off.
+    """
+    n_tokens = estimate_request_tokens(request)
+    model = request['model']
+    order = _routing_order(model)
+    for position, deployment in enumerate(order):
+        is_last = position == len(order) - 1
+        deployment.limiter(model).acquire(n_tokens=n_tokens)
+        client = deployment.client if is_last else deployment.client.with_options(max_retries=0)
+        try:
+            return endpoint(client)(**request)
+        except _FAILOVER_ERRORS as e:
+            if is_last:
+                raise
+            deployment.cool_down(e)
+
+def create_chat_completion(**request) -> Any:
+    """Create a chat completion on the healthiest deployment (see _call_routed)."""
+    return _call_routed(lambda client: client.chat.completions.create, request)
+
+def create_embeddings(**request) -> Any:
+    """Create embeddings on the healthiest deployment (see _call_routed)."""
+    return _call_routed(lambda client: client.embeddings.create, request)
+
+class AsyncOpenAIRouter:
+    """
+    Async counterpart of the routed calls, holding one async client per deployment.
+    
+    Async clients are tied to the event loop they first run on, so create a router per
+    batch and close it when the batch completes (``async with``).
+    """
+    
+    def __init__(self):
+        self._clients = {}
+    
+    async def __aenter__(self) -> "AsyncOpenAIRouter":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+    
+    def _client(self, deployment: _Deployment) -> AsyncAzureOpenAI:
+        client = self._clients.get(deployment.endpoint)
+        if client is None:
+            client = AsyncAzureOpenAI(
+                **deployment.client_options(),
+                http_client=httpx.AsyncClient(limits=_http_limits(), http2=_HTTP2_AVAILABLE)
+            )
+            self._clients[deployment.endpoint] = client
+        return client
+    
+    async def create_chat_completion(self, **request) -> Any:
+        """
+        Await a chat completion on the healthiest deployment, failing over like _call_routed.
+        
+        Waits for budget happen off the event loop so other requests keep running.
+        """
+        n_tokens = estimate_request_tokens(request)
+        model = request['model']
+        loop = asyncio.get_running_loop()
+        order = _routing_order(model)
+        for position, deployment in enumerate(order):
+            is_last = position == len(order) - 1
+            limiter = deployment.limiter(model)
+            await loop.run_in_executor(None, lambda: limiter.acquire(n_tokens=n_tokens))
+            client = self._client(deployment)
+            if not is_last:
+                client = client.with_options(max_retries=0)
+            try:
+                return await client.chat.completions.create(**request)
+            except _FAILOVER_ERRORS as e:
+                if is_last:
+                    raise
+                deployment.cool_down(e)
+
+def count_tokens(text: str) -> int:
+    """Count tokens for a text, estimating ~4 characters per token without tiktoken."""
+    if _TOKEN_ENCODING is not None:
+        return len(_TOKEN_ENCODING.encode(text))
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text to at most max_tokens tokens (~4 characters per token without tiktoken)."""
+    # A token spans at least one character, so short texts never need encoding
+    if len(text) <= max_tokens:
+        return text
+    if _TOKEN_ENCODING is not None:
+        tokens = _TOKEN_ENCODING.encode(text)
+        return text if len(tokens) <= max_tokens else _TOKEN_ENCODING.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+def build_embedding_batches(texts: List[str]) -> List[List[str]]:
+    """Pack texts into request batches bounded by token budget and item count."""
+    batches = []
+    current, current_tokens = [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if current and (current_tokens + tokens > Config.EMBED_MAX_BATCH_TOKENS
+                        or len(current) >= Config.BATCH_SIZE):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def embed_batch(batch: List[str]) -> List[List[float]]:
+    """Embed one batch of texts with a single API request."""
+    response = create_embeddings(
+        model=Config.AZURE_OPENAI_EMBEDDING_MODEL,
+        input=batch,
+        encoding_format="float"
+    )
+    return [item.embedding for item in response.data]
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Embed texts with token-aware batching, sending batches concurrently.
+    
+    Returns a float32 matrix with one row per input text, in input order.
+    """
+    batches = build_embedding_batches(texts)
+    if not batches:
+        return np.empty((0, 0), dtype=np.float32)
+    
+    # Requests are network-bound, so run them concurrently and keep input order
+    if len(batches) == 1:
+        batch_embeddings = [embed_batch(batches[0])]
+    else:
+        workers = min(Config.EMBED_CONCURRENCY, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            batch_embeddings = list(executor.map(embed_batch, batches))
+    
+    dimension = len(batch_embeddings[0][0])
+    embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+    row = 0
+    for batch in batch_embeddings:
+        embeddings[row:row + len(batch)] = batch
+        row += len(batch)
+    
+    return embeddings
@@ -1,22 +1,57 @@
 """
 Pinecone service for handling feedback embeddings.
 """
-import numpy as np
-import json
-from typing import List, Dict, Tuple, Optional, Any
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Dict, Iterable, Optional, Union
 from datetime import datetime
+from functools import lru_cache
+import numpy as np
 from loguru import logger
-import pandas as pd
 
 from pinecone.grpc import PineconeGRPC as Pinecone
 from pinecone import ServerlessSpec
-try:
-    from langchain_openai import AzureOpenAIEmbeddings
-except ImportError:
-    from langchain_community.embeddings import OpenAIEmbeddings as AzureOpenAIEmbeddings
-    logger.warning("Using deprecated AzureOpenAIEmbeddings. Consider upgrading: pip install langchain-openai")
 
 from config.settings import Config
+from services.openai_client import get_openai_client, embed_batch, embed_texts
+from services.embedding_service import upsert_batches_concurrently
+from utils.common import chunks, l2_normalize, normalize_description
+
+if TYPE_CHECKING:
+    # Only rebuilds take a DataFrame (built by the caller), so pandas is not imported at runtime
+    import pandas as pd
+
+@lru_cache(maxsize=Config.EMBED_QUERY_CACHE_SIZE)
+def _embed_query_cached(model: str, text: str) -> np.ndarray:
+    """
+    Embed one text, memoized by model and exact text.
+    
+    The same description is embedded repeatedly (exact-match check, similarity search,
+    feedback upsert), so repeats skip the OpenAI round-trip. The text is not normalized:
+    case and padding change the embedding. Vectors are kept as read-only float32 arrays,
+    about a tenth of the memory of Python float lists, and scaled to unit length to match
+    the dot-product index.
+    """
+    vector = l2_normalize(embed_batch([text])[0])
+    vector.setflags(write=False)
+    return vector
+
+def _feedback_vector_id(description: str, timestamp: str) -> str:
+    """
+    Deterministic vector ID for a feedback entry.
+    
+    The builtin hash() is salted per process, so rebuilding the index wrote new IDs (and
+    duplicate vectors) on every run; the same description and timestamp now always upsert
+    onto the same vector.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(description.encode('utf-8'))
+    digest.update(b'\x00')
+    digest.update(timestamp.encode('utf-8'))
+    return f"feedback_{digest.hexdigest()}"
 
 class PineconeFeedbackService:
     """Service for handling feedback embeddings using Pinecone."""
@@ -35,14 +70,9 @@ class PineconeFeedbackService:
             self.pinecone_available = False
             return
         
-        # Initialize Azure OpenAI embeddings
+        # Embed through the shared Azure OpenAI client rather than a LangChain wrapper
         try:
-            self.embeddings = AzureOpenAIEmbeddings(
-                openai_api_key=Config.AZURE_OPENAI_API_KEY,
-                azure_endpoint=Config.AZURE_OPENAI_ENDPOINT,
-                api_version=Config.AZURE_OPENAI_API_VERSION,
-                model=Config.AZURE_OPENAI_EMBEDDING_MODEL
-            )
+            self.client = get_openai_client()
         except Exception as e:
             logger.error(f"Failed to initialize Azure OpenAI embeddings: {str(e)}")
             self.pinecone_available = False
@@ -51,35 +81,68 @@ class PineconeFeedbackService:
         self.index_name = Config.PINECONE_FEEDBACK_INDEX_NAME
         self.index = None
         self.is_initialized = False
+        self._probe_vector = None
+        self._index_names = None
+        self._index_names_expire_at = 0.0
         
         logger.info("PineconeFeedbackService initialized using Azure OpenAI")
     
+    def embed_query(self, text: str) -> np.ndarray:
+        """
+        Embed a single text with the Azure OpenAI embeddings endpoint, reusing recent results.
+        
+        Returns:
+            Read-only float32 unit vector, shared with the cache; convert with .tolist()
+            when sending it to Pinecone
+        """
+        return _embed_query_cached(Config.AZURE_OPENAI_EMBEDDING_MODEL, text)
+    
+    def _existing_index_names(self) -> List[str]:
+        """Names of the project's indexes, cached for PINECONE_LIST_INDEXES_TTL seconds."""
+        now = time.monotonic()
+        if self._index_names is None or now >= self._index_names_expire_at:
+            self._index_names = self.pc.list_indexes().names()
+            self._index_names_expire_at = now + Config.PINECONE_LIST_INDEXES_TTL
+        return self._index_names
+    
+    def _invalidate_index_names(self) -> None:
+        """Forget the cached index names after creating or deleting an index."""
+        self._index_names = None
+    
     def initialize_index(self) -> bool:
         """Initialize or connect to existing Pinecone feedback index."""
         if not self.pinecone_available:
             logger.warning("Pinecone not available, skipping index initialization")
             return False
-            
+        
+        # The service is shared by the classifier and feedback handlers, each of which
+        # initializes it; reuse the open connection instead of repeating the setup RPCs
+        if self.is_initialized:
+            return True
+        
         try:
             # Check if index exists
-            existing_indexes = self.pc.list_indexes().names()
+            existing_indexes = self._existing_index_names()
             
             if self.index_name not in existing_indexes:
                 logger.info(f"Creating new Pinecone feedback index: {self.index_name}")
                 
-                # Get embedding dimension
-                test_embedding = self.embeddings.embed_query("test")
-                dimension = len(test_embedding)
+                # Get embedding dimension, probing the model only when it is not configured
+                dimension = Config.AZURE_OPENAI_EMBEDDING_DIMENSION
+                if not dimension:
+                    test_embedding = self.embed_query("test")
+                    dimension = len(test_embedding)
                 
                 self.pc.create_index(
                     name=self.index_name,
                     dimension=dimension,
-                    metric="cosine",
+                    metric=Config.PINECONE_FEEDBACK_METRIC,
                     spec=ServerlessSpec(
                         cloud=Config.PINECONE_CLOUD,
                         region=Config.PINECONE_REGION
                     )
                 )
+                self._invalidate_index_names()
                 logger.info(f"Created Pinecone feedback index with dimension {dimension}")
             else:
                 logger.info(f"Using existing Pinecone feedback index: {self.index_name}")
@@ -92,6 +155,10 @@ class PineconeFeedbackService:
             stats = self.index.describe_index_stats()
             logger.info(f"Pinecone feedback index connected. Total vectors: {stats.total_vector_count}")
             
+            # Metadata-filtered lookups still need a query vector; any non-zero one of the
+            # index dimension will do (cosine indexes reject all-zero vectors)
+            self._probe_vector = [1.0] + [0.0] * (stats.dimension - 1)
+            
             return True
             
         except Exception as e:
@@ -108,15 +175,16 @@ class PineconeFeedbackService:
         try:
             # Generate embedding for the description
             description = feedback_entry['description']
-            embedding = self.embeddings.embed_query(description)
+            embedding = self.embed_query(description)
             
             # Create unique vector ID
             timestamp = feedback_entry.get('timestamp', datetime.now().isoformat())
-            vector_id = f"feedback_{hash(description + timestamp)}_{datetime.now().microsecond}"
+            vector_id = _feedback_vector_id(description, timestamp)
             
             # Prepare metadata
             metadata = {
                 'description': description,
+                'description_lower': normalize_description(description),
                 'predicted_code': feedback_entry['predicted_code'],
                 'correct_code': feedback_entry['correct_code'],
                 'timestamp': timestamp,
@@ -127,7 +195,7 @@ class PineconeFeedbackService:
             # Upsert to Pinecone
             self.index.upsert(vectors=[{
                 'id': vector_id,
-                'values': embedding,
+                'values': embedding.tolist(),
                 'metadata': metadata
             }])
             
@@ -138,53 +206,91 @@ class PineconeFeedbackService:
             logger.error(f"Error adding feedback embedding to Pinecone: {str(e)}")
             return False
     
-    def batch_add_feedback_embeddings(self, feedback_entries: List[Dict]) -> bool:
-        """Add multiple feedback embeddings to Pinecone."""
+    def batch_add_feedback_embeddings(self, feedback_entries: Iterable[Dict]) -> bool:
+        """
+        Add multiple feedback embeddings to Pinecone.
+        
+        Entries are embedded and upserted BATCH_SIZE at a time, so a generator of entries is
+        never held in memory whole and uploads start as soon as the first batch is embedded.
+        Embedding the next batch overlaps with upserting the current one.
+        """
         if not self.pinecone_available or not self.is_initialized:
             logger.warning("Pinecone feedback service not available or initialized")
             return False
             
         try:
-            # Prepare vectors for batch upsert
-            vectors = []
-            descriptions = [entry['description'] for entry in feedback_entries]
-            embeddings = self.embeddings.embed_documents(descriptions)
-            
-            for i, (feedback_entry, embedding) in enumerate(zip(feedback_entries, embeddings)):
-                timestamp = feedback_entry.get('timestamp', datetime.now().isoformat())
-                vector_id = f"feedback_{hash(feedback_entry['description'] + timestamp)}_{i}"
-                
-                metadata = {
-                    'description': feedback_entry['description'],
-                    'predicted_code': feedback_entry['predicted_code'],
-                    'correct_code': feedback_entry['correct_code'],
-                    'timestamp': timestamp,
-                    'type': 'feedback',
-                    'is_correction': feedback_entry['predicted_code'] != feedback_entry['correct_code']
-                }
-                
-                vectors.append({
-                    'id': vector_id,
-                    'values': embedding,
-                    'metadata': metadata
-                })
-            
-            # Batch upsert to Pinecone
-            batch_size = 100  # Pinecone batch limit
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
-            
-            logger.info(f"Batch added {len(feedback_entries)} feedback embeddings to Pinecone")
+            added = 0
+            
+            def vector_batches():
+                nonlocal added
+                # Embed one chunk ahead, so the next chunk's OpenAI request runs while the
+                # current one is handed to Pinecone; at most two chunks are held at once
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    pending = None
+                    for chunk in chunks(feedback_entries, Config.BATCH_SIZE):
+                        future = executor.submit(self._feedback_vectors, chunk)
+                        if pending is not None:
+                            vectors = pending.result()
+                            added += len(vectors)
+                            yield vectors
+                        pending = future
+                    
+                    if pending is not None:
+                        vectors = pending.result()
+                        added += len(vectors)
+                        yield vectors
+            
+            # Batch upsert to Pinecone, keeping several batches in flight while the next embeds
+            upsert_batches_concurrently(self.index, vector_batches())
+            
+            logger.info(f"Batch added {added} feedback embeddings to Pinecone")
             return True
             
         except Exception as e:
             logger.error(f"Error batch adding feedback embeddings to Pinecone: {str(e)}")
             return False
     
+    def _feedback_vectors(self, feedback_entries: List[Dict]) -> List[Dict]:
+        """Embed a batch of feedback entries and build their Pinecone vectors."""
+        vectors = [None] * len(feedback_entries)
+        # Repeated descriptions are embedded once and their vector reused
+        descriptions = [entry['description'] for entry in feedback_entries]
+        unique_descriptions = list(dict.fromkeys(descriptions))
+        # Unit-length rows make dot-product scores equal cosine similarity; convert the float32
+        # matrix to lists in one call rather than per row
+        unique_embeddings = l2_normalize(embed_texts(unique_descriptions)).tolist()
+        row_by_description = {description: row for row, description in enumerate(unique_descriptions)}
+        
+        for i, feedback_entry in enumerate(feedback_entries):
+            embedding = unique_embeddings[row_by_description[feedback_entry['description']]]
+            timestamp = feedback_entry.get('timestamp', datetime.now().isoformat())
+            vector_id = _feedback_vector_id(feedback_entry['description'], timestamp)
+            
+            metadata = {
+                'description': feedback_entry['description'],
+                'description_lower': normalize_description(feedback_entry['description']),
+                'predicted_code': feedback_entry['predicted_code'],
+                'correct_code': feedback_entry['correct_code'],
+                'timestamp': timestamp,
+                'type': 'feedback',
+                'is_correction': feedback_entry['predicted_code'] != feedback_entry['correct_code']
+            }
+            
+            vectors[i] = {
+                'id': vector_id,
+                'values': embedding,
+                'metadata': metadata
+            }
+        
+        return vectors
+    
     def search_similar_feedback(self, query: str, top_k: int = None, 
-                              similarity_threshold: float = None) -> List[Dict]:
-        """Search for similar feedback entries using Pinecone."""
+                              similarity_threshold: float = None,
+                              query_embedding: Optional[Union[np.ndarray, List[float]]] = None) -> List[Dict]:
+        """Search for similar feedback entries using Pinecone.
+        
+        Pass query_embedding when the query has already been embedded to skip the OpenAI call.
+        """
         # Use configuration defaults if not provided
         top_k = top_k or Config.PINECONE_FEEDBACK_TOP_K_DEFAULT
         similarity_threshold = similarity_threshold or Config.PINECONE_FEEDBACK_SIMILARITY_THRESHOLD
@@ -195,79 +301,182 @@ class PineconeFeedbackService:
             
         try:
             # Generate query embedding
-            query_embedding = self.embeddings.embed_query(query)
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
             # Search in Pinecone with filter for corrections only
-            search_results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k * 2,  # Get more to filter
-                filter={'is_correction': True},
-                include_metadata=True
-            )
-            
-            # Process and filter results
-            results = []
-            for match in search_results.matches:
-                similarity_score = float(match.score)
-                
-                if similarity_score >= similarity_threshold:
-                    metadata = match.metadata
-                    
-                    results.append({
-                        'description': metadata['description'],
-                        'predicted_code': metadata['predicted_code'],
-                        'correct_code': metadata['correct_code'],
-                        'similarity_score': similarity_score,
-                        'timestamp': metadata['timestamp'],
-                        'pinecone_id': match.id
-                    })
-            
-            # Sort by similarity score (highest first) and return top_k
-            results.sort(key=lambda x: x['similarity_score'], reverse=True)
+            matches = self._query_corrections(query_embedding, top_k * 2)  # Get more to filter
+            results = self._similar_from_matches(matches, top_k, similarity_threshold)
             
             logger.info(f"Pinecone feedback search found {len(results)} similar feedback entries")
-            return results[:top_k]
+            return results
             
         except Exception as e:
             logger.error(f"Error searching Pinecone feedback: {str(e)}")
             return []
     
-    def check_exact_match(self, description: str) -> Optional[Dict]:
-        """Check for exact description match in Pinecone metadata."""
+    async def asearch_similar_feedback(self, query: str, top_k: int = None,
+                                       similarity_threshold: float = None) -> List[Dict]:
+        """Async counterpart of search_similar_feedback for callers running an event loop.
+        
+        The embedding request and gRPC query run in a worker thread, so concurrent
+        searches overlap on the network instead of blocking the loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self.search_similar_feedback(query, top_k, similarity_threshold)
+        )
+    
+    def check_exact_match(self, description: str,
+                          query_embedding: Optional[Union[np.ndarray, List[float]]] = None) -> Optional[Dict]:
+        """Check for exact description match in Pinecone metadata.
+        
+        Pass query_embedding when the description has already been embedded to skip the OpenAI call.
+        """
         try:
             if not self.pinecone_available or not self.is_initialized:
                 return None
             
-            # Search with high top_k to find potential exact matches
-            query_embedding = self.embeddings.embed_query(description)
+            exact_match = self._exact_match_by_metadata(description)
+            if exact_match is not None:
+                return exact_match
             
-            search_results = self.index.query(
-                vector=query_embedding,
-                top_k=50,
-                filter={'is_correction': True},
-                include_metadata=True
-            )
+            # Entries stored before description_lower existed are only found by vector search
+            if query_embedding is None:
+                query_embedding = self.embed_query(description)
             
-            description_lower = description.lower().strip()
-            
-            # Look for exact match in metadata
-            for match in search_results.matches:
-                metadata = match.metadata
-                if metadata['description'].lower().strip() == description_lower:
-                    return {
-                        'description': metadata['description'],
-                        'predicted_code': metadata['predicted_code'],
-                        'correct_code': metadata['correct_code'],
-                        'similarity_score': 1.0,
-                        'timestamp': metadata['timestamp'],
-                        'pinecone_id': match.id
-                    }
+            matches = self._query_corrections(query_embedding, 50)
+            return self._exact_from_matches(description, matches)
             
+        except Exception as e:
+            logger.error(f"Error checking exact match in Pinecone: {str(e)}")
             return None
+    
+    def lookup(self, description: str, top_k: int = None,
+               similarity_threshold: float = None) -> Dict:
+        """
+        Run the exact-match check and the similarity search from a single Pinecone query.
+        
+        Args:
+            description: Product description to look up
+            top_k: Maximum number of similar entries to return
+            similarity_threshold: Minimum similarity score for similar entries
+            
+        Returns:
+            Dictionary with 'exact' (match dict or None) and 'similar' (list of matches,
+            empty when an exact match was found)
+        """
+        top_k = top_k or Config.PINECONE_FEEDBACK_TOP_K_DEFAULT
+        similarity_threshold = similarity_threshold or Config.PINECONE_FEEDBACK_SIMILARITY_THRESHOLD
+        result = {'exact': None, 'similar': []}
+        
+        if not self.pinecone_available or not self.is_initialized:
+            logger.warning("Pinecone feedback service not available, returning empty results")
+            return result
+        
+        try:
+            # An exact correction is found by metadata alone, without embedding the description
+            result['exact'] = self._exact_match_by_metadata(description)
+            if result['exact'] is not None:
+                return result
+            
+            # One embedding and one query serve both lookups; the exact-match window
+            # is the larger of the two, so it also covers the similarity candidates
+            query_embedding = self.embed_query(description)
+            matches = self._query_corrections(query_embedding, max(50, top_k * 2))
+            
+            result['exact'] = self._exact_from_matches(description, matches)
+            if result['exact'] is None:
+                result['similar'] = self._similar_from_matches(matches, top_k, similarity_threshold)
+                logger.info(f"Pinecone feedback search found {len(result['similar'])} similar feedback entries")
+            
+            return result
             
         except Exception as e:
-            logger.error(f"Error checking exact match in Pinecone: {str(e)}")
+            logger.error(f"Error looking up Pinecone feedback: {str(e)}")
+            return result
+    
+    def _exact_match_by_metadata(self, description: str) -> Optional[Dict]:
+        """
+        Find an exact correction through the description_lower metadata filter.
+        
+        A failed query returns None rather than raising, so callers still run their vector
+        search, which finds exact matches too, just at the cost of an embedding.
+        """
+        if self._probe_vector is None:
+            return None
+        
+        try:
+            search_results = self.index.query(
+                vector=self._probe_vector,
+                top_k=1,
+                filter={
+                    'description_lower': {'$eq': normalize_description(description)},
+                    'is_correction': True
+                },
+                include_metadata=True
+            )
+        except Exception as e:
+            logger.warning(f"Metadata exact-match query failed, falling back to vector search: {str(e)}")
             return None
+        return self._exact_from_matches(description, search_results.matches)
+    
+    def _query_corrections(self, query_embedding: Union[np.ndarray, List[float]], top_k: int) -> List:
+        """Query the feedback index for the nearest corrections."""
+        # Callers may pass their own embedding; scale it like the stored vectors
+        search_results = self.index.query(
+            vector=l2_normalize(query_embedding).tolist(),
+            top_k=top_k,
+            filter={'is_correction': True},
+            include_metadata=True
+        )
+        return search_results.matches
+    
+    @staticmethod
+    def _exact_from_matches(description: str, matches: List) -> Optional[Dict]:
+        """Return the first match whose description equals the query, ignoring case and padding."""
+        description_lower = normalize_description(description)
+        
+        # Look for exact match in metadata; stored descriptions recur across queries,
+        # so their normalized form usually comes straight from the cache
+        for match in matches:
+            metadata = match.metadata
+            if normalize_description(metadata['description']) == description_lower:
+                return {
+                    'description': metadata['description'],
+                    'predicted_code': metadata['predicted_code'],
+                    'correct_code': metadata['correct_code'],
+                    'similarity_score': 1.0,
+                    'timestamp': metadata['timestamp'],
+                    'pinecone_id': match.id
+                }
+        
+        return None
+    
+    @staticmethod
+    def _similar_from_matches(matches: List, top_k: int, similarity_threshold: float) -> List[Dict]:
+        """Convert query matches at or above the threshold into feedback results.
+        
+        Pinecone returns matches ordered by descending score, so the scan stops at the
+        first match below the threshold or once top_k results are collected.
+        """
+        results = []
+        for match in matches:
+            similarity_score = float(match.score)
+            if similarity_score < similarity_threshold or len(results) >= top_k:
+                break
+            
+            metadata = match.metadata
+            results.append({
+                'description': metadata['description'],
+                'predicted_code': metadata['predicted_code'],
+                'correct_code': metadata['correct_code'],
+                'similarity_score': similarity_score,
+                'timestamp': metadata['timestamp'],
+                'pinecone_id': match.id
+            })
+        
+        return results
     
     def get_feedback_stats(self) -> Dict:
         """Get statistics about the Pinecone feedback index."""
@@ -329,7 +538,7 @@ class PineconeFeedbackService:
             logger.error(f"Error checking if Pinecone feedback index has data: {str(e)}")
             return False
     
-    def rebuild_from_feedback_data(self, feedback_df: pd.DataFrame) -> bool:
+    def rebuild_from_feedback_data(self, feedback_df: 'pd.DataFrame') -> bool:
         """Rebuild Pinecone feedback index from existing feedback data."""
         try:
             logger.info(f"Rebuilding Pinecone feedback index from {len(feedback_df)} feedback entries")
@@ -338,6 +547,7 @@ class PineconeFeedbackService:
             if self.is_initialized:
                 try:
                     self.pc.delete_index(self.index_name)
+                    self._invalidate_index_names()
                     logger.info("Deleted existing Pinecone feedback index")
                 except Exception as e:
                     logger.warning(f"Could not delete existing index: {str(e)}")
@@ -348,29 +558,25 @@ class PineconeFeedbackService:
                 logger.error("Failed to reinitialize Pinecone feedback index")
                 return False
             
-            # Convert DataFrame to list of dicts
-            feedback_entries = []
-            for _, row in feedback_df.iterrows():
-                # Only include corrections
-                if row['predicted_code'] != row['correct_code']:
-                    # Fix timestamp conversion
-                    timestamp = row['timestamp']
-                    if hasattr(timestamp, 'isoformat'):
-                        timestamp_str = timestamp.isoformat()
-                    else:
-                        timestamp_str = str(timestamp)
-                    
-                    feedback_entries.append({
-                        'description': str(row['description']),
-                        'predicted_code': str(row['predicted_code']),
-                        'correct_code': str(row['correct_code']),
-                        'timestamp': timestamp_str
-                    })
-            
-            if not feedback_entries:
+            # Stream corrections as dicts; the mask filters in one vectorized pass and
+            # itertuples avoids boxing every row into a Series
+            corrections = feedback_df[feedback_df['predicted_code'] != feedback_df['correct_code']]
+            if corrections.empty:
                 logger.info("No corrections found in feedback data")
                 return True
             
+            feedback_entries = (
+                {
+                    'description': str(description),
+                    'predicted_code': str(predicted_code),
+                    'correct_code': str(correct_code),
+                    'timestamp': timestamp.isoformat() if hasattr(timestamp, 'isoformat') else str(timestamp)
+                }
+                for description, predicted_code, correct_code, timestamp in corrections[
+                    ['description', 'predicted_code', 'correct_code', 'timestamp']
+                ].itertuples(index=False, name=None)
+            )
+            
             # Batch add all feedback entries
             success = self.batch_add_feedback_embeddings(feedback_entries)
             
@@ -388,8 +594,9 @@ class PineconeFeedbackService:
     def delete_index(self) -> bool:
         """Delete the Pinecone feedback index."""
         try:
-            if self.pinecone_available and self.index_name in self.pc.list_indexes().names():
+            if self.pinecone_available and self.index_name in self._existing_index_names():
                 self.pc.delete_index(self.index_name)
+                self._invalidate_index_names()
                 logger.info(f"Deleted Pinecone feedback index: {self.index_name}")
                 self.is_initialized = False
                 return True
@@ -397,3 +604,20 @@ class PineconeFeedbackService:
         except Exception as e:
             logger.error(f"Error deleting Pinecone feedback index: {str(e)}")
             return False
+
+_feedback_service: Optional[PineconeFeedbackService] = None
+_feedback_service_lock = threading.Lock()
+
+def get_pinecone_feedback_service() -> PineconeFeedbackService:
+    """
+    Return the process-wide Pinecone feedback service, creating it on first use.
+    
+    Each instance opens its own Pinecone gRPC channel; sharing one lets the classifier
+    and the feedback handlers reuse the same connection and initialized index.
+    """
+    global _feedback_service
+    if _feedback_service is None:
+        with _feedback_service_lock:
+            if _feedback_service is None:
+                _feedback_service = PineconeFeedbackService()
+    return _feedback_service
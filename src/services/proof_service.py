@@ -1,14 +1,97 @@
 """
 Service to provide validation of HTS codes with pdf-proof
 """
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Dict
 import fitz  # PyMuPDF
+import numpy as np
 from pdf2image import convert_from_path
+from loguru import logger
+
+# Chapter PDFs are opened once per process and shared across proof requests.
+# fitz.Document is not thread-safe, so callers hold the path's lock while using one.
+_chapter_locks = {}
+
+@lru_cache(maxsize=32)
+def _open_chapter(path: str) -> fitz.Document:
+    """Open a chapter PDF, reusing the already-parsed document on later calls."""
+    return fitz.open(path)
+
+def _chapter_lock(path: str) -> threading.Lock:
+    """Lock serializing access to the cached document for path."""
+    return _chapter_locks.setdefault(path, threading.Lock())
+
+# Persistent {chapter file: {'mtime', 'pages': {code: 1-based page}}} index, so a code's page
+# is found without extracting the text of every page on each lookup
+PAGE_INDEX_FILE = "hts_index.json"
+_HTS_CODE_PATTERN = re.compile(r'\b\d{4}\.\d{2}(?:\.\d{2})?')
+_page_index = None
+_page_index_lock = threading.Lock()
+
+def _load_page_index(pdf_dir: str) -> Dict:
+    """Read the persisted page index once per process (caller holds _page_index_lock)."""
+    global _page_index
+    if _page_index is None:
+        try:
+            with open(os.path.join(pdf_dir, PAGE_INDEX_FILE), 'r') as f:
+                _page_index = json.load(f)
+        except (OSError, ValueError):
+            _page_index = {}
+    return _page_index
+
+def _chapter_page_index(path: str) -> Dict[str, int]:
+    """
+    Map each HTS code in a chapter PDF to the first page it appears on.
+    
+    Built from one text pass over the chapter on first use, then persisted next to the PDFs
+    and rebuilt only when the PDF's modification time changes. Eight-digit codes are also
+    registered under their six-digit prefix, matching the substring search they replace.
+    """
+    pdf_dir, chapter_file = os.path.split(path)
+    mtime = os.path.getmtime(path)
+    with _page_index_lock:
+        entry = _load_page_index(pdf_dir).get(chapter_file)
+        if entry and entry['mtime'] == mtime:
+            return entry['pages']
+    
+    pages = {}
+    doc = _open_chapter(path)
+    with _chapter_lock(path):
+        for page_num in range(len(doc)):
+            for code in _HTS_CODE_PATTERN.findall(doc.load_page(page_num).get_text()):
+                pages.setdefault(code[:7], page_num + 1)
+                pages.setdefault(code, page_num + 1)
+    
+    with _page_index_lock:
+        page_index = _load_page_index(pdf_dir)
+        page_index[chapter_file] = {'mtime': mtime, 'pages': pages}
+        try:
+            index_path = os.path.join(pdf_dir, PAGE_INDEX_FILE)
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(page_index, f)
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            logger.warning(f"Could not persist HTS page index: {str(e)}")
+    return pages
 
 class ProofService:
-    def __init__(self, hts_code: str):
-        """Initialize the ProofService."""
+    def __init__(self, hts_code: str, zoom: float = 2.0):
+        """
+        Initialize the ProofService.
+        
+        Args:
+            hts_code: HTS code to find and highlight
+            zoom: Render scale of proof images (pixel count grows with its square);
+                memory-sensitive callers can pass a lower value
+        """
         self.pdf_path = "Data/pdfs"
         self.images = None
+        self.zoom = zoom
         self.hts_code = hts_code
         self.code_parts = hts_code.split('.')
         self.page = 0
@@ -33,16 +116,22 @@ class ProofService:
             search_code = hts_code  # fallback
 
         search_path = f"{self.pdf_path}/Chapter {code_parts[0][:2]}.pdf"
-        doc = fitz.open(search_path)
+        page_num = _chapter_page_index(search_path).get(search_code)
+        if page_num is not None:
+            self.page = page_num
+            return self.page
+        
+        # Codes the index does not cover (e.g. bare headings) fall back to scanning the pages
+        doc = _open_chapter(search_path)
 
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text = page.get_text()
-            
-            # Search by exact HTS code
-            if search_code in text:
-                self.page = page_num + 1
-                return self.page
+        with _chapter_lock(search_path):
+            for page_num in range(len(doc)):
+                page = doc.load_page(page_num)
+                
+                # Search by exact HTS code in MuPDF
+                if page.search_for(search_code):
+                    self.page = page_num + 1
+                    return self.page
         # Return most likely page (fallback if description not found)
         if found_pages:
             return found_pages[0][0]
@@ -70,8 +159,7 @@ class ProofService:
         Returns:
             List containing the PIL Image with highlighted text
         """
-        import io
-        from PIL import Image, ImageDraw
+        from PIL import Image
         
         # Use the search code by default if no highlight text is provided
         if highlight_text is None:
@@ -84,93 +172,73 @@ class ProofService:
                 highlight_text = self.hts_code
 
         search_path = f"{self.pdf_path}/Chapter {self.code_parts[0][:2]}.pdf"
-        doc = fitz.open(search_path)
-        page = doc.load_page(page_num - 1)  # 0-based index
-        
-        # Higher zoom = higher resolution
-        zoom = 2.0
-        mat = fitz.Matrix(zoom, zoom)
-        
-        # Search for text and get rectangles for main HTS code
-        text_instances = page.search_for(highlight_text)
-        
-        # Look for the subheading code_parts[3] if it exists and has length > 0
-        subheading_instances = []
-        if len(self.code_parts) == 4 and self.code_parts[3]:
-            subheading = self.code_parts[3]
+        doc = _open_chapter(search_path)
+
+        with _chapter_lock(search_path):
+            page = doc.load_page(page_num - 1)  # 0-based index
             
-            if text_instances:
-                # Get the main code instance coordinates
-                main_instance = text_instances[0]  # Use the first instance found
-                right_x = main_instance[2]  # Right x-coordinate
-                top_y = main_instance[1]    # Top y-coordinate
-                bottom_y = main_instance[3] # Bottom y-coordinate
-                
-                # Search for the subheading in the whole document
-                all_subheadings = page.search_for(subheading)
-                
-                # Filter to find only instances that are:
-                # 1. To the right of the main code
-                # 2. Either on the same row OR below the main code on the page
-                vertical_tolerance = (bottom_y - top_y) * 2  # For determining "same row"
-                
-                subheading_instances = [
-                    inst for inst in all_subheadings 
-                    if inst[0] > right_x and  # To the right of the main code
-                       (
-                           # Same row (approximately)
-                           abs((inst[1] + inst[3])/2 - (top_y + bottom_y)/2) < vertical_tolerance or
-                           # OR below the main code
-                           inst[1] >= bottom_y
-                       )
-                ]
+            # Higher zoom = higher resolution
+            mat = fitz.Matrix(self.zoom, self.zoom)
+            
+            # Search for text and get rectangles for main HTS code
+            text_instances = page.search_for(highlight_text)
+            
+            # Look for the subheading code_parts[3] if it exists and has length > 0
+            subheading_instances = []
+            if len(self.code_parts) == 4 and self.code_parts[3]:
+                subheading = self.code_parts[3]
                 
-                # Sort by vertical position to prioritize instances on the same row
-                if subheading_instances:
-                    subheading_instances.sort(key=lambda inst: abs((inst[1] + inst[3])/2 - (top_y + bottom_y)/2))
-    
-        # Create pixmap (image)
-        pix = page.get_pixmap(matrix=mat)
-        
-        # Convert to PIL Image
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                if text_instances:
+                    # Get the main code instance coordinates
+                    main_instance = text_instances[0]  # Use the first instance found
+                    right_x = main_instance[2]  # Right x-coordinate
+                    top_y = main_instance[1]    # Top y-coordinate
+                    bottom_y = main_instance[3] # Bottom y-coordinate
+                    
+                    # Search for the subheading in the whole document
+                    all_subheadings = page.search_for(subheading)
+                    
+                    # Filter to find only instances that are:
+                    # 1. To the right of the main code
+                    # 2. Either on the same row OR below the main code on the page
+                    # Vectorized, as short subheadings (e.g. "00") can match hundreds of times per page
+                    vertical_tolerance = (bottom_y - top_y) * 2  # For determining "same row"
+                    
+                    if all_subheadings:
+                        rects = np.array([tuple(inst) for inst in all_subheadings])
+                        row_distance = np.abs((rects[:, 1] + rects[:, 3]) / 2 - (top_y + bottom_y) / 2)
+                        mask = (rects[:, 0] > right_x) & (
+                            (row_distance < vertical_tolerance) | (rects[:, 1] >= bottom_y)
+                        )
+                        
+                        # Sort by vertical position to prioritize instances on the same row
+                        order = np.argsort(row_distance[mask], kind='stable')
+                        subheading_instances = [fitz.Rect(rect) for rect in rects[mask][order]]
         
-        # Create a transparent overlay for highlighting
-        overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(overlay)
-        
-        # If text instances found, highlight them
-        if text_instances:
-            # Draw yellow semi-transparent highlight around each main code instance
+            # Highlight in MuPDF itself so the page is rendered once with the highlights in place
+            annots = []
             for inst in text_instances:
-                # Scale the coordinates according to zoom factor
-                rect = [coord * zoom for coord in inst]
-                
-                # Draw rectangle with yellow highlight (semi-transparent)
-                draw.rectangle(
-                    [(rect[0], rect[1]), (rect[2], rect[3])],
-                    fill=(255, 255, 0, 80),  # Yellow with alpha
-                    outline=(255, 165, 0),   # Orange outline
-                    width=2
-                )
-    
-        # If subheading instances found, highlight them differently
-        if subheading_instances:
-            # Draw light blue semi-transparent highlight around each subheading instance
-            # for inst in subheading_instances:
-            # Scale the coordinates according to zoom factor
-            rect = [coord * zoom for coord in subheading_instances[0]]
+                annot = page.add_highlight_annot(inst)
+                annot.set_colors(stroke=(1, 1, 0))  # Yellow
+                annot.update()
+                annots.append(annot)
             
-            # Draw rectangle with blue highlight (semi-transparent)
-            draw.rectangle(
-                [(rect[0], rect[1]), (rect[2], rect[3])],
-                fill=(135, 206, 250, 80),  # Light blue with alpha
-                outline=(0, 0, 255),       # Blue outline
-                width=2
-            )
-    
-        # Combine the overlay with the original image
-        img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
+            if subheading_instances:
+                annot = page.add_highlight_annot(subheading_instances[0])
+                annot.set_colors(stroke=(0.53, 0.81, 0.98))  # Light blue
+                annot.update()
+                annots.append(annot)
+            
+            try:
+                # Create pixmap (image): color only when there are highlights, never an alpha channel
+                colorspace = fitz.csRGB if annots else fitz.csGRAY
+                pix = page.get_pixmap(matrix=mat, colorspace=colorspace, alpha=False)
+            finally:
+                # The document is shared across requests, so leave its pages unannotated
+                for annot in annots:
+                    page.delete_annot(annot)
+            
+        img = Image.frombytes("RGB" if pix.n == 3 else "L", [pix.width, pix.height], pix.samples)
         
         self.images = [img]
         return self.images
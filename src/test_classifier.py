@@ -1,5 +1,12 @@
+import argparse
+import hashlib
+import pickle
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List
 from loguru import logger
+from config.settings import Config
 from data_loader.json_loader import HTSDataLoader
 from preprocessor.text_processor import TextPreprocessor
 from classifier.hts_classifier import HTSClassifier
@@ -15,8 +22,54 @@ def setup_test_logger():
         print(f"Failed to setup test logging: {e}")
         return False
 
-def test_classification():
-    """Test the HTS classification system with sample products."""
+# Classifier outputs cached across runs by --cached, keyed by description, top_k and index data
+CLASSIFY_CACHE_DIR = Config.CACHE_DIR / "classify"
+
+def _index_version(classifier: HTSClassifier) -> str:
+    """Fingerprint of the indexed HTS codes, so cached outputs expire when the data changes."""
+    return hashlib.blake2b("\n".join(classifier.hts_codes).encode('utf-8'), digest_size=16).hexdigest()
+
+def _classify_cached(classifier: HTSClassifier, description: str, top_k: int, index_version: str) -> List[Dict]:
+    """
+    Classify a description, reusing the result of an earlier run with the same index data.
+    
+    Args:
+        classifier: Classifier with a built index
+        description: Product description to classify
+        top_k: Number of results to return
+        index_version: Fingerprint from _index_version
+        
+    Returns:
+        Classification results, as returned by classifier.classify
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (description, str(top_k), index_version):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    cache_path = CLASSIFY_CACHE_DIR / f"{digest.hexdigest()}.pkl"
+    
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            logger.warning(f"Ignoring unreadable classification cache {cache_path.name}: {str(e)}")
+    
+    results = classifier.classify(description, top_k=top_k)
+    CLASSIFY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, 'wb') as f:
+        pickle.dump(results, f)
+    return results
+
+def test_classification(use_cache: bool = False, sequential: bool = False):
+    """
+    Test the HTS classification system with sample products.
+    
+    Args:
+        use_cache: Reuse classifier outputs from earlier runs on the same index data
+            (skips the embedding and search work, so only for iterating on output handling)
+        sequential: Run the test cases one at a time, keeping the log lines in test order
+    """
     # Initialize logging
     if not setup_test_logger():
         print("Warning: Test logging setup failed, continuing without proper logging")
@@ -54,34 +107,55 @@ def test_classification():
             "Aluminum window frames, anodized"
         ]
         
+        # Repeated descriptions are classified once
+        test_cases = list(dict.fromkeys(test_cases))
+        index_version = _index_version(classifier) if use_cache else None
+        
         logger.info(f"Starting test classification with {len(test_cases)} test cases")
         
-        # Run tests
-        for i, description in enumerate(test_cases, 1):
-            print(f"\nTesting {i}/{len(test_cases)}: {description}")
-            print("-" * 80)
+        def run_case(i: int, description: str) -> str:
+            """Classify one test case and return its printable report."""
+            lines = [f"\nTesting {i}/{len(test_cases)}: {description}", "-" * 80]
             
             try:
-                logger.info(f"Test {i}: Processing '{description}'")
-                results = classifier.classify(description, top_k=3)
+                # Lazy arguments are only formatted when a sink accepts INFO messages
+                logger.opt(lazy=True).info("Test {}: Processing '{}'", lambda: i, lambda: description)
+                if use_cache:
+                    results = _classify_cached(classifier, description, 3, index_version)
+                else:
+                    results = classifier.classify(description, top_k=3)
                 
-                logger.info(f"Test {i}: Returned {len(results)} results")
+                logger.opt(lazy=True).info("Test {}: Returned {} results", lambda: i, lambda: len(results))
                 
                 for j, result in enumerate(results, 1):
-                    print(f"{j}. HTS Code: {result['hts_code']}")
+                    lines.append(f"{j}. HTS Code: {result['hts_code']}")
                     if result.get('chapter_context'):
-                        print(f"   Chapter: {result['chapter_context']}")
-                    print(f"   Description: {result['description']}")
-                    print(f"   Confidence: {result['confidence']}%")
-                    print(f"   General Rate: {result['general_rate']}")
+                        lines.append(f"   Chapter: {result['chapter_context']}")
+                    lines.append(f"   Description: {result['description']}")
+                    lines.append(f"   Confidence: {result['confidence']}%")
+                    lines.append(f"   General Rate: {result['general_rate']}")
                     if result['units']:
-                        print(f"   Units: {', '.join(result['units'])}")
-                    print("-" * 40)
+                        lines.append(f"   Units: {', '.join(result['units'])}")
+                    lines.append("-" * 40)
                     
             except Exception as e:
                 log_system_error(f"Test {i}", str(e))
-                print(f"Error: {str(e)}")
+                lines.append(f"Error: {str(e)}")
+            
+            return "\n".join(lines) + "\n"
+        
+        # Run tests. Cases spend their time waiting on OpenAI and Pinecone, so by default they
+        # run concurrently; reports are still written in test order, each with one call
+        case_numbers = range(1, len(test_cases) + 1)
+        if sequential:
+            for i, description in zip(case_numbers, test_cases):
+                sys.stdout.write(run_case(i, description))
+        else:
+            with ThreadPoolExecutor(max_workers=min(8, len(test_cases))) as executor:
+                for report in executor.map(run_case, case_numbers, test_cases):
+                    sys.stdout.write(report)
         
+        sys.stdout.flush()
         logger.info("Test suite completed successfully")
         
     except Exception as e:
@@ -89,4 +163,10 @@ def test_classification():
         print(f"Test initialization error: {str(e)}")
 
 if __name__ == "__main__":
-    test_classification()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the HTS classifier test cases.")
+    parser.add_argument("--cached", action="store_true",
+                        help="reuse classifier outputs from earlier runs on the same HTS data")
+    parser.add_argument("--sequential", action="store_true",
+                        help="run test cases one at a time for deterministic logging")
+    args = parser.parse_args()
+    test_classification(use_cache=args.cached, sequential=args.sequential)
\ No newline at end of file
@@ -1,9 +1,40 @@
-from typing import Dict, List, Optional
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from loguru import logger
 import json
 
+from config.settings import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Analyses kept by DataFrame fingerprint; reports for a handful of periods are requested together
+_ANALYSIS_CACHE_SIZE = 16
+
+# Rows rendered per CSV export chunk
+_CSV_CHUNK_ROWS = 10000
+
+# Insight message templates, bound once rather than re-parsed as f-strings per item
+_CHAPTER_AREA = "Chapter {}".format
+_ERROR_RATE_ISSUE = "High error rate: {:.1%}".format
+_PATTERN_RECOMMENDATION = "Review classification logic for pattern {} (occurred {} times)".format
+
+def _iter_csv(feedback_df: pd.DataFrame) -> Iterator[str]:
+    """Yield a DataFrame as CSV text, _CSV_CHUNK_ROWS rows at a time, through one reused buffer."""
+    buffer = io.StringIO()
+    for start in range(0, len(feedback_df), _CSV_CHUNK_ROWS):
+        feedback_df.iloc[start:start + _CSV_CHUNK_ROWS].to_csv(buffer, index=False, header=start == 0)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
 class AzureFeedbackTrainer:
     """
     Utility class for training and analytics using Azure Blob Storage feedback data.
@@ -19,6 +50,10 @@ class AzureFeedbackTrainer:
         """
         self.feedback_handler = feedback_handler
         self.pinecone_feedback_service = pinecone_feedback_service
+        # Report, training-data and recommendation requests share one download (the widest
+        # window asked for, as (fetched_at, days, DataFrame)) and one analysis per period
+        self._feedback_window: Optional[Tuple[float, int, pd.DataFrame]] = None
+        self._analysis_cache: Dict[str, Dict] = {}
         
     def prepare_training_data(self, days: int = 30) -> Dict:
         """
@@ -34,9 +69,9 @@ class AzureFeedbackTrainer:
             logger.info(f"Preparing training data from Azure Blob Storage for last {days} days...")
             
             # Get recent feedback data
-            feedback_df = self.feedback_handler.get_recent_feedback(days=days)
+            feedback_df = self._get_or_fetch_feedback(days)
             
-            if feedback_df.empty:
+            if len(feedback_df) == 0:
                 return {
                     'success': False,
                     'error': 'No feedback data available for training'
@@ -65,6 +100,67 @@ class AzureFeedbackTrainer:
             logger.error(f"Error preparing training data from Azure: {str(e)}")
             return {'success': False, 'error': str(e)}
 
+    def _get_or_fetch_feedback(self, days: int) -> pd.DataFrame:
+        """
+        Get recent feedback, reusing a download from the last FEEDBACK_REPORT_CACHE_TTL seconds.
+        
+        Shorter periods are sliced from the widest window downloaded so far, so a dashboard
+        asking for 7 and 30 days makes one round-trip rather than two.
+        
+        Args:
+            days: Number of days of feedback to fetch
+            
+        Returns:
+            DataFrame with feedback data
+        """
+        now = time.monotonic()
+        window = self._feedback_window
+        if window is not None and now - window[0] < Config.FEEDBACK_REPORT_CACHE_TTL:
+            window_days, window_df = window[1], window[2]
+            if days == window_days or (days < window_days and len(window_df) == 0):
+                return window_df
+            if days < window_days:
+                return window_df[window_df['timestamp'] >= datetime.now() - timedelta(days=days)]
+            # A wider period than the cached one; fetch it and keep it as the new window
+        
+        feedback_df = self._coerce_codes(self.feedback_handler.get_recent_feedback(days=days))
+        self._feedback_window = (now, days, feedback_df)
+        return feedback_df
+    
+    @staticmethod
+    def _coerce_codes(feedback_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Store the code columns as categoricals sharing one set of categories.
+        
+        Feedback repeats a small set of HTS codes, so integer category codes take a fraction
+        of the memory of object strings, and with shared categories equal codes mean equal
+        values, letting comparisons run on the integers.
+        
+        Args:
+            feedback_df: DataFrame with feedback data
+            
+        Returns:
+            DataFrame with categorical predicted_code and correct_code columns
+        """
+        if len(feedback_df) == 0:
+            return feedback_df
+        
+        predicted = feedback_df['predicted_code']
+        correct = feedback_df['correct_code']
+        if isinstance(predicted.dtype, pd.CategoricalDtype) and predicted.dtype == correct.dtype:
+            return feedback_df
+        
+        categories = pd.Index(np.concatenate([predicted.to_numpy(), correct.to_numpy()])).dropna().unique()
+        dtype = pd.CategoricalDtype(categories=categories)
+        return feedback_df.assign(predicted_code=predicted.astype(dtype), correct_code=correct.astype(dtype))
+    
+    @staticmethod
+    def _feedback_fingerprint(feedback_df: pd.DataFrame) -> str:
+        """Cheap content key for a feedback DataFrame: row count plus hashes of the code columns."""
+        predicted_hash = pd.util.hash_pandas_object(feedback_df['predicted_code'], index=False).sum()
+        correct_hash = pd.util.hash_pandas_object(feedback_df['correct_code'], index=False).sum()
+        return f"{len(feedback_df)}:{predicted_hash}:{correct_hash}"
+
     def _analyze_feedback_data(self, feedback_df: pd.DataFrame) -> Dict:
         """
         Analyze feedback data for training insights.
@@ -85,57 +181,103 @@ class AzureFeedbackTrainer:
                 'chapter_performance': {}
             }
             
-            if feedback_df.empty:
+            if len(feedback_df) == 0:
                 return analysis
             
+            fingerprint = self._feedback_fingerprint(feedback_df)
+            cached = self._analysis_cache.get(fingerprint)
+            if cached is not None:
+                return cached
+            
+            # Work column-wise: chapter prefixes and the error mask are derived once for every
+            # row instead of iterating the DataFrame row by row
+            feedback_df = self._coerce_codes(feedback_df)
+            predicted_codes = feedback_df['predicted_code'].cat.codes.to_numpy()
+            correct_codes = feedback_df['correct_code'].cat.codes.to_numpy()
+            
+            # Both columns share one category set, so chapters are sliced once per distinct HTS
+            # code and gathered by category code; missing codes (-1) pick the trailing 'na',
+            # as str(nan)[:2] would. Two-digit chapters also get their number (-1 otherwise)
+            # so they can be tallied with integer bincounts
+            categories = feedback_df['predicted_code'].cat.categories
+            chapter_by_code = np.append(categories.astype(str).str.slice(0, 2).to_numpy(dtype=object), 'na')
+            chapter_number_by_code = np.array(
+                [int(chapter) if len(chapter) == 2 and chapter.isdecimal() else -1 for chapter in chapter_by_code],
+                dtype=np.int64
+            )
+            pred_chapters = pd.Series(chapter_by_code[predicted_codes], index=feedback_df.index)
+            correct_chapters = pd.Series(chapter_by_code[correct_codes], index=feedback_df.index)
+            pred_numbers = chapter_number_by_code[predicted_codes]
+            correct_numbers = chapter_number_by_code[correct_codes]
+            
+            # Compare integer category codes once; the mask is reused for every statistic below.
+            # Missing codes are -1 on both sides and, as NaN != NaN, count as errors
+            is_error = (predicted_codes != correct_codes) | (predicted_codes < 0)
+            
             # Calculate corrections
-            corrections = feedback_df[feedback_df['predicted_code'] != feedback_df['correct_code']]
-            analysis['total_corrections'] = len(corrections)
+            analysis['total_corrections'] = int(is_error.sum())
             
             # Calculate accuracy
             if len(feedback_df) > 0:
-                analysis['accuracy_rate'] = (len(feedback_df) - len(corrections)) / len(feedback_df)
+                analysis['accuracy_rate'] = (len(feedback_df) - analysis['total_corrections']) / len(feedback_df)
+            
+            # Analyze correction patterns by chapter: numeric chapter pairs are counted in one
+            # flat bincount over pred * 100 + correct, without building a pattern string per row
+            crosses_chapter = is_error & (pred_chapters != correct_chapters).to_numpy()
+            numeric_pair = crosses_chapter & (pred_numbers >= 0) & (correct_numbers >= 0)
+            pair_counts = np.bincount(pred_numbers[numeric_pair] * 100 + correct_numbers[numeric_pair], minlength=10000)
+            chapter_stats = {
+                f"{pair // 100:02d}->{pair % 100:02d}": int(pair_counts[pair])
+                for pair in np.flatnonzero(pair_counts)
+            }
             
-            # Analyze correction patterns by chapter
-            chapter_stats = {}
-            for _, row in corrections.iterrows():
-                pred_chapter = str(row['predicted_code'])[:2]
-                correct_chapter = str(row['correct_code'])[:2]
-                
-                if pred_chapter != correct_chapter:
-                    pattern = f"{pred_chapter}->{correct_chapter}"
-                    chapter_stats[pattern] = chapter_stats.get(pattern, 0) + 1
-            
-            # Get top patterns
-            analysis['top_patterns'] = sorted(
-                [(pattern, count) for pattern, count in chapter_stats.items()],
-                key=lambda x: x[1], reverse=True
-            )[:5]
-            
-            # Identify problematic chapters (chapters with high error rates)
-            chapter_errors = {}
-            for _, row in feedback_df.iterrows():
-                pred_chapter = str(row['predicted_code'])[:2]
-                if pred_chapter not in chapter_errors:
-                    chapter_errors[pred_chapter] = {'total': 0, 'errors': 0}
-                
-                chapter_errors[pred_chapter]['total'] += 1
-                if row['predicted_code'] != row['correct_code']:
-                    chapter_errors[pred_chapter]['errors'] += 1
-            
-            # Calculate error rates
-            for chapter, stats in chapter_errors.items():
-                if stats['total'] >= 3:  # Only consider chapters with enough data
-                    error_rate = stats['errors'] / stats['total']
-                    if error_rate > 0.4:  # 40% error rate threshold
-                        analysis['problematic_chapters'].append({
-                            'chapter': chapter,
-                            'error_rate': error_rate,
-                            'total_predictions': stats['total']
-                        })
+            # Patterns involving blank or malformed codes are rare; count those directly
+            other_pair = crosses_chapter & ~numeric_pair
+            if other_pair.any():
+                patterns = pred_chapters[other_pair] + '->' + correct_chapters[other_pair]
+                chapter_stats.update((pattern, int(count)) for pattern, count in patterns.value_counts(sort=False).items())
+            
+            # Get top patterns with a partial selection rather than sorting every pattern
+            top_patterns = pd.Series(chapter_stats, dtype=np.int64).nlargest(5, keep='first')
+            analysis['top_patterns'] = [(pattern, int(count)) for pattern, count in top_patterns.items()]
+            
+            # Identify problematic chapters (chapters with high error rates). Two-digit chapters
+            # index straight into per-chapter counters, tallied by bincount in one pass
+            is_numeric = pred_numbers >= 0
+            chapter_numbers = pred_numbers[is_numeric]
+            totals = np.bincount(chapter_numbers, minlength=100)
+            errors = np.bincount(chapter_numbers, weights=is_error[is_numeric].astype(np.float64), minlength=100)
+            chapter_errors = {
+                f"{chapter:02d}": {'total': int(totals[chapter]), 'errors': int(errors[chapter])}
+                for chapter in np.flatnonzero(totals)
+            }
+            
+            # Prefixes of blank or malformed codes are rare; count those directly
+            if not is_numeric.all():
+                other_counts = pd.DataFrame({
+                    'chapter': pred_chapters[~is_numeric].to_numpy(),
+                    'error': is_error[~is_numeric]
+                }).groupby('chapter', sort=False)['error'].agg(['size', 'sum'])
+                for chapter, total, chapter_error_count in other_counts.itertuples(name=None):
+                    chapter_errors[chapter] = {'total': int(total), 'errors': int(chapter_error_count)}
+            
+            # Calculate error rates; only consider chapters with enough data and a 40% error rate
+            analysis['problematic_chapters'] = [
+                {
+                    'chapter': chapter,
+                    'error_rate': stats['errors'] / stats['total'],
+                    'total_predictions': stats['total']
+                }
+                for chapter, stats in chapter_errors.items()
+                if stats['total'] >= 3 and stats['errors'] / stats['total'] > 0.4
+            ]
             
             analysis['chapter_performance'] = chapter_errors
             
+            if len(self._analysis_cache) >= _ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.pop(next(iter(self._analysis_cache)))
+            self._analysis_cache[fingerprint] = analysis
+            
             return analysis
             
         except Exception as e:
@@ -173,18 +315,19 @@ class AzureFeedbackTrainer:
                 insights['data_quality'] = 'fair'
             
             # Identify priority areas from problematic chapters
-            for chapter_info in analysis['problematic_chapters']:
-                insights['priority_areas'].append({
-                    'area': f"Chapter {chapter_info['chapter']}",
-                    'issue': f"High error rate: {chapter_info['error_rate']:.1%}",
+            insights['priority_areas'] = [
+                {
+                    'area': _CHAPTER_AREA(chapter_info['chapter']),
+                    'issue': _ERROR_RATE_ISSUE(chapter_info['error_rate']),
                     'priority': 'high' if chapter_info['error_rate'] > 0.6 else 'medium'
-                })
+                }
+                for chapter_info in analysis['problematic_chapters']
+            ]
             
             # Recommendations for top patterns
-            for pattern, count in analysis['top_patterns'][:3]:
-                insights['recommendations'].append(
-                    f"Review classification logic for pattern {pattern} (occurred {count} times)"
-                )
+            insights['recommendations'].extend(
+                _PATTERN_RECOMMENDATION(pattern, count) for pattern, count in analysis['top_patterns'][:3]
+            )
             
             return insights
             
@@ -192,13 +335,18 @@ class AzureFeedbackTrainer:
             logger.error(f"Error generating training insights: {str(e)}")
             return {'recommendations': [], 'priority_areas': []}
 
-    def generate_feedback_report(self, days: int = 30, format: str = 'dict') -> Dict:
+    def generate_feedback_report(self, days: int = 30, format: str = 'dict',
+                                 path_or_buf: Optional[Union[str, IO[str]]] = None,
+                                 stream: bool = False) -> Dict:
         """
         Generate comprehensive feedback report from Azure Blob Storage.
         
         Args:
             days: Number of days to include in report
             format: Report format ('dict', 'csv', 'json')
+            path_or_buf: For 'csv', a path or text stream to write the CSV to directly
+            stream: For 'csv', also return the CSV as an iterator of chunks ('csv_iter')
+                instead of one 'csv_data' string
             
         Returns:
             Comprehensive feedback report
@@ -206,16 +354,30 @@ class AzureFeedbackTrainer:
         try:
             logger.info(f"Generating feedback report from Azure for last {days} days...")
             
-            # Get feedback data and metrics
-            feedback_df = self.feedback_handler.get_recent_feedback(days=days)
-            quality_metrics = self.feedback_handler.get_feedback_quality_metrics(days=days) if hasattr(self.feedback_handler, 'get_feedback_quality_metrics') else {}
-            correction_patterns = self.feedback_handler.get_correction_patterns(days=days) if hasattr(self.feedback_handler, 'get_correction_patterns') else {}
+            # Get feedback data and metrics; each is a separate blob round-trip, so fetch them
+            # concurrently and wait for the slowest rather than their sum
+            fetches = {'feedback_df': lambda: self._get_or_fetch_feedback(days)}
+            if hasattr(self.feedback_handler, 'get_feedback_quality_metrics'):
+                fetches['quality_metrics'] = lambda: self.feedback_handler.get_feedback_quality_metrics(days=days)
+            if hasattr(self.feedback_handler, 'get_correction_patterns'):
+                fetches['correction_patterns'] = lambda: self.feedback_handler.get_correction_patterns(days=days)
+            
+            if len(fetches) == 1:
+                fetched = {name: fetch() for name, fetch in fetches.items()}
+            else:
+                with ThreadPoolExecutor(max_workers=len(fetches)) as executor:
+                    futures = {name: executor.submit(fetch) for name, fetch in fetches.items()}
+                    fetched = {name: future.result() for name, future in futures.items()}
+            
+            feedback_df = fetched['feedback_df']
+            quality_metrics = fetched.get('quality_metrics', {})
+            correction_patterns = fetched.get('correction_patterns', {})
             
             report = {
                 'report_generated': datetime.now().isoformat(),
                 'period_days': days,
                 'summary': {
-                    'total_entries': len(feedback_df) if not feedback_df.empty else 0,
+                    'total_entries': len(feedback_df),
                     'total_corrections': quality_metrics.get('total_corrections', 0),
                     'correction_rate': quality_metrics.get('correction_rate', 0),
                     'data_freshness': quality_metrics.get('data_freshness'),
@@ -226,7 +388,7 @@ class AzureFeedbackTrainer:
                 'detailed_analysis': {}
             }
             
-            if not feedback_df.empty:
+            if len(feedback_df) > 0:
                 # Add detailed analysis
                 analysis = self._analyze_feedback_data(feedback_df)
                 report['detailed_analysis'] = analysis
@@ -237,9 +399,9 @@ class AzureFeedbackTrainer:
             
             # Format output based on requested format
             if format == 'json':
-                return {'report_json': json.dumps(report, indent=2)}
+                return {'report_json': self._dump_report_json(report)}
             elif format == 'csv':
-                return self._export_to_csv(feedback_df, report)
+                return self._export_to_csv(feedback_df, report, path_or_buf, stream)
             else:
                 return report
                 
@@ -247,30 +409,54 @@ class AzureFeedbackTrainer:
             logger.error(f"Error generating feedback report from Azure: {str(e)}")
             return {'error': str(e)}
 
-    def _export_to_csv(self, feedback_df: pd.DataFrame, report: Dict) -> Dict:
+    @staticmethod
+    def _dump_report_json(report: Dict) -> str:
+        """Serialize a report as indented JSON, using orjson when installed."""
+        if orjson is not None:
+            # orjson also handles numpy scalars and datetimes natively
+            return orjson.dumps(
+                report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            ).decode('utf-8')
+        return json.dumps(report, indent=2)
+    
+    def _export_to_csv(self, feedback_df: pd.DataFrame, report: Dict,
+                       path_or_buf: Optional[Union[str, IO[str]]] = None,
+                       stream: bool = False) -> Dict:
         """
         Export feedback data and report to CSV format.
         
+        By default the CSV is returned as one 'csv_data' string. Large exports can skip
+        building that string: it is written straight to path_or_buf when given, or with
+        stream returned as a single-use iterator of chunks ('csv_iter').
+        
         Args:
             feedback_df: DataFrame with feedback data
             report: Report dictionary
+            path_or_buf: Optional path or text stream to write the CSV to
+            stream: Return 'csv_iter' in place of 'csv_data'
             
         Returns:
             Dictionary with CSV export information
         """
         try:
-            if feedback_df.empty:
-                return {'csv_data': '', 'summary': report['summary']}
-            
-            # Convert DataFrame to CSV string
-            csv_data = feedback_df.to_csv(index=False)
+            if len(feedback_df) == 0:
+                empty = {'csv_iter': iter(())} if stream else {'csv_data': ''}
+                return {**empty, 'summary': report['summary']}
             
-            return {
-                'csv_data': csv_data,
+            export = {
                 'summary': report['summary'],
                 'export_timestamp': datetime.now().isoformat()
             }
             
+            if path_or_buf is not None:
+                feedback_df.to_csv(path_or_buf, index=False, chunksize=_CSV_CHUNK_ROWS)
+            elif stream:
+                export['csv_iter'] = _iter_csv(feedback_df)
+            else:
+                export['csv_data'] = feedback_df.to_csv(index=False)
+            
+            return export
+            
         except Exception as e:
             logger.error(f"Error exporting to CSV: {str(e)}")
             return {'error': str(e)}
@@ -286,9 +472,9 @@ class AzureFeedbackTrainer:
             List of training recommendations
         """
         try:
-            feedback_df = self.feedback_handler.get_recent_feedback(days=days)
+            feedback_df = self._get_or_fetch_feedback(days)
             
-            if feedback_df.empty:
+            if len(feedback_df) == 0:
                 return []
             
             analysis = self._analyze_feedback_data(feedback_df)
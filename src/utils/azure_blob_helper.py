@@ -1,17 +1,45 @@
 import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 import pandas as pd
 from loguru import logger
+import requests
+from requests.adapters import HTTPAdapter
+from azure.core.pipeline.transport import RequestsTransport
 from azure.storage.blob import BlobServiceClient, BlobClient
 from io import StringIO, BytesIO
 from typing import Dict, Optional
 from config.settings import Config
-from utils.common import format_hts_code
+from utils.common import format_hts_code, exponential_backoff_delay
+
+@lru_cache(maxsize=1)
+def _get_service_client(connection_string: str) -> BlobServiceClient:
+    """
+    Build the process-wide BlobServiceClient, so every helper shares one HTTP pipeline.
+    
+    The session's pool is sized for parallel chunked transfers, which otherwise exhaust
+    urllib3's default of 10 connections per host and reopen connections on every chunk.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=Config.AZURE_CONNECTION_POOL_SIZE,
+                          pool_maxsize=Config.AZURE_CONNECTION_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return BlobServiceClient.from_connection_string(
+        connection_string,
+        transport=RequestsTransport(session=session, session_owner=False)
+    )
 
 class AzureBlobHelper:
     """Helper class for Azure Blob Storage operations."""
     
+    FAISS_INDEX_BLOB_KEY = 'feedback/faiss_index.index'
+    FAISS_METADATA_BLOB_KEY = 'feedback/faiss_metadata.pkl'
+    
     # def __init__(self):
     #     """Initialize Azure Blob helper with configuration."""
     #     self.container_name = Config.AZURE_CONTAINER_NAME
@@ -37,12 +65,21 @@ class AzureBlobHelper:
         if not connection_string:
             raise ValueError("AZURE_STORAGE_CONNECTION_STRING not found in environment variables")
         
-        # Initialize using connection string
-        self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+        # Shared across helpers, so the connection pool stays warm between feedback operations
+        self.blob_service_client = _get_service_client(connection_string)
         self.azure_client = self.blob_service_client.get_blob_client(
             container=self.container_name, 
             blob=self.feedback_blob_key
         )
+        # Blob clients are built once and reused, as each carries its own URL and pipeline state
+        self.faiss_index_client = self.blob_service_client.get_blob_client(
+            container=self.container_name,
+            blob=self.FAISS_INDEX_BLOB_KEY
+        )
+        self.faiss_metadata_client = self.blob_service_client.get_blob_client(
+            container=self.container_name,
+            blob=self.FAISS_METADATA_BLOB_KEY
+        )
 
     def initialize_container(self) -> bool:
         """Initialize Azure Blob container and test connection."""
@@ -59,13 +96,9 @@ class AzureBlobHelper:
     def read_feedback(self) -> pd.DataFrame:
         """Read feedback data from Azure Blob Storage."""
         try:
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name, 
-                blob=self.feedback_blob_key
-            )
-            blob_data = blob_client.download_blob()
-            content = blob_data.content_as_text()
-            return pd.read_csv(StringIO(content))
+            # The feedback history is one CSV blob; large ones download as parallel range requests
+            blob_data = self.azure_client.download_blob(max_concurrency=Config.AZURE_DOWNLOAD_CONCURRENCY)
+            return pd.read_csv(BytesIO(blob_data.readall()))
         except Exception as e:
             if 'BlobNotFound' in str(e) or '404' in str(e):
                 logger.info("Feedback file not found in Azure Blob Storage, creating empty DataFrame")
@@ -80,12 +113,7 @@ class AzureBlobHelper:
             csv_buffer = StringIO()
             df.to_csv(csv_buffer, index=False)
             
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name,
-                blob=self.feedback_blob_key
-            )
-            
-            blob_client.upload_blob(
+            self.azure_client.upload_blob(
                 csv_buffer.getvalue(),
                 overwrite=True
             )
@@ -98,23 +126,21 @@ class AzureBlobHelper:
     def upload_faiss_index(self, index_path: Path, metadata_path: Path) -> bool:
         """Upload FAISS index and metadata to Azure Blob Storage."""
         try:
-            # Upload FAISS index file
-            index_blob_key = 'feedback/faiss_index.index'
-            with open(index_path, 'rb') as f:
-                blob_client = self.blob_service_client.get_blob_client(
-                    container=self.container_name,
-                    blob=index_blob_key
-                )
-                blob_client.upload_blob(f.read(), overwrite=True)
-            
-            # Upload metadata file
-            metadata_blob_key = 'feedback/faiss_metadata.pkl'
-            with open(metadata_path, 'rb') as f:
-                blob_client = self.blob_service_client.get_blob_client(
-                    container=self.container_name,
-                    blob=metadata_blob_key
-                )
-                blob_client.upload_blob(f.read(), overwrite=True)
+            def upload(blob_client: BlobClient, path: Path) -> None:
+                with open(path, 'rb') as f:
+                    # Streamed from the file rather than read into memory first; multi-MB
+                    # indexes go up as blocks staged in parallel
+                    blob_client.upload_blob(f, overwrite=True, length=path.stat().st_size,
+                                            max_concurrency=Config.AZURE_UPLOAD_CONCURRENCY)
+            
+            # The two blobs are independent, so transfer them side by side on the shared client
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [
+                    executor.submit(upload, self.faiss_index_client, index_path),
+                    executor.submit(upload, self.faiss_metadata_client, metadata_path),
+                ]
+                for future in futures:
+                    future.result()
             
             logger.info("Successfully uploaded FAISS index and metadata to Azure Blob Storage")
             return True
@@ -126,37 +152,27 @@ class AzureBlobHelper:
     def download_faiss_index(self, local_index_path: Path, local_metadata_path: Path) -> bool:
         """Download FAISS index and metadata from Azure Blob Storage."""
         try:
-            # Download FAISS index file
-            index_blob_key = 'feedback/faiss_index.index'
-            try:
-                blob_client = self.blob_service_client.get_blob_client(
-                    container=self.container_name,
-                    blob=index_blob_key
-                )
-                with open(local_index_path, 'wb') as f:
-                    blob_data = blob_client.download_blob()
-                    f.write(blob_data.readall())
-            except Exception as e:
-                if 'BlobNotFound' in str(e):
-                    logger.info("FAISS index not found in Azure Blob Storage")
-                    return False
-                raise
+            def download(blob_client: BlobClient, path: Path, label: str) -> bool:
+                try:
+                    with open(path, 'wb') as f:
+                        blob_data = blob_client.download_blob(max_concurrency=Config.AZURE_DOWNLOAD_CONCURRENCY)
+                        blob_data.readinto(f)
+                    return True
+                except Exception as e:
+                    if 'BlobNotFound' in str(e):
+                        logger.info(f"{label} not found in Azure Blob Storage")
+                        return False
+                    raise
             
-            # Download metadata file
-            metadata_blob_key = 'feedback/faiss_metadata.pkl'
-            try:
-                blob_client = self.blob_service_client.get_blob_client(
-                    container=self.container_name,
-                    blob=metadata_blob_key
-                )
-                with open(local_metadata_path, 'wb') as f:
-                    blob_data = blob_client.download_blob()
-                    f.write(blob_data.readall())
-            except Exception as e:
-                if 'BlobNotFound' in str(e):
-                    logger.info("FAISS metadata not found in Azure Blob Storage")
-                    return False
-                raise
+            # The two blobs are independent, so transfer them side by side on the shared client
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [
+                    executor.submit(download, self.faiss_index_client, local_index_path, "FAISS index"),
+                    executor.submit(download, self.faiss_metadata_client, local_metadata_path, "FAISS metadata"),
+                ]
+                found = [future.result() for future in futures]
+            if not all(found):
+                return False
             
             logger.info("Successfully downloaded FAISS index and metadata from Azure Blob Storage")
             return True
@@ -266,6 +282,13 @@ class AzureBlobHelper:
             return False
     
 class FeedbackHandler:
+    # Azure appends download, merge and re-upload the whole CSV, so they run in the background
+    # on one shared worker: add_feedback returns without waiting on storage round trips, and
+    # appends from every handler in the process apply in order without losing rows
+    _storage_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="feedback-storage")
+    _pending_saves: Dict[str, Future] = {}
+    _pending_lock = threading.Lock()
+    
     def __init__(self, use_azure=True, pinecone_feedback_service=None):
         """Initialize the feedback handler.
         
@@ -336,7 +359,12 @@ class FeedbackHandler:
             logger.info(f"Created new feedback file at {self.feedback_file}")
     
     def _load_feedback_data(self):
-        """Load existing feedback data."""
+        """Load existing feedback data, including appends still being uploaded."""
+        self._wait_for_pending_saves()
+        return self._read_feedback_data()
+    
+    def _read_feedback_data(self):
+        """Read the stored feedback data."""
         try:
             if self.use_azure:
                 return self.azure_helper.read_feedback()
@@ -354,21 +382,81 @@ class FeedbackHandler:
         else:
             df.to_csv(self.feedback_file, index=False)
     
+    def _append_feedback_data(self, new_entry, key: str) -> Optional[Future]:
+        """
+        Append feedback rows, without rewriting the existing data when stored locally.
+        
+        Args:
+            new_entry: DataFrame of rows to append
+            key: Identifier of the append (the entry timestamp), used to track it while pending
+            
+        Returns:
+            Future of the background Azure upload, or None when the rows were written locally.
+            The caller must wait on it: a failed upload is only raised through the future.
+        """
+        if not self.use_azure:
+            new_entry.to_csv(self.feedback_file, mode='a', header=not self.feedback_file.exists(), index=False)
+            return None
+        
+        future = self._storage_executor.submit(self._merge_and_upload, new_entry)
+        with self._pending_lock:
+            self._pending_saves[key] = future
+        future.add_done_callback(lambda f: self._forget_pending_save(key, f))
+        return future
+    
+    def _merge_and_upload(self, new_entry) -> None:
+        """Merge rows into the stored feedback and upload it, retrying with exponential backoff."""
+        # Block blobs are replaced whole, so merge with the stored data first
+        df = pd.concat([self._read_feedback_data(), new_entry], ignore_index=True)
+        for attempt in range(Config.MAX_RETRIES):
+            try:
+                self._save_feedback_data(df)
+                return
+            except Exception as e:
+                if attempt == Config.MAX_RETRIES - 1:
+                    logger.error(f"Giving up on feedback upload after {Config.MAX_RETRIES} attempts: {str(e)}")
+                    raise
+                delay = exponential_backoff_delay(attempt, Config.BASE_DELAY)
+                logger.warning(f"Feedback upload failed, retrying in {delay}s: {str(e)}")
+                time.sleep(delay)
+    
+    @classmethod
+    def _forget_pending_save(cls, key: str, future: Future) -> None:
+        """Drop a finished append from the pending set."""
+        with cls._pending_lock:
+            if cls._pending_saves.get(key) is future:
+                del cls._pending_saves[key]
+    
+    @classmethod
+    def _wait_for_pending_saves(cls) -> None:
+        """
+        Block until appends submitted so far have been uploaded or have failed.
+        
+        Failures are left to the add_feedback call that submitted the append, which raises them.
+        """
+        with cls._pending_lock:
+            pending = list(cls._pending_saves.values())
+        for future in pending:
+            try:
+                future.result()
+            except Exception:
+                pass  # raised to the submitting add_feedback call
+    
     def add_feedback(self, description, predicted_code, correct_code):
         """Add new feedback entry and update Pinecone feedback index."""
         try:
             logger.info("Adding feedback...")
-            df = self._load_feedback_data()
+            timestamp = datetime.now().isoformat()
             
             new_entry = pd.DataFrame([{
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "description": description,
                 "predicted_code": predicted_code,
                 "correct_code": correct_code,
             }])
             
-            df = pd.concat([df, new_entry], ignore_index=True)
-            self._save_feedback_data(df)
+            # On Azure this returns while the upload is in flight, overlapping it with the Pinecone add
+            pending_save = self._append_feedback_data(new_entry, timestamp)
             
             # Add to Pinecone feedback index if available
             if self.pinecone_feedback_service:
@@ -378,7 +466,7 @@ class FeedbackHandler:
                         'description': description,
                         'predicted_code': predicted_code,
                         'correct_code': correct_code,
-                        'timestamp': datetime.now().isoformat()
+                        'timestamp': timestamp
                     }
                     
                     success = self.pinecone_feedback_service.add_feedback_embedding(feedback_entry)
@@ -389,6 +477,10 @@ class FeedbackHandler:
                         
                 except Exception as e:
                     logger.error(f"Error adding feedback to Pinecone feedback: {str(e)}")
+            
+            # Only report the entry as added once it is stored; a failed upload raises here
+            if pending_save is not None:
+                pending_save.result()
 
             storage_location = "Azure Blob Storage" if (self.use_azure and self.azure_available) else "local file"
             logger.info(f"Added new feedback entry for HTS code: {correct_code} to {storage_location}")
@@ -519,21 +611,16 @@ class FeedbackHandler:
                 }
             
             total = len(df)
-            correct = sum(df['predicted_code'] == df['correct_code'])
+            correct = int((df['predicted_code'] == df['correct_code']).sum())
             accuracy = correct / total if total > 0 else 0
             
             logger.debug(f"Total entries: {total}, Correct predictions: {correct}, Accuracy: {accuracy}")
             
             # Use configuration for recent entries count
             recent_count = Config.DASHBOARD_RECENT_ENTRIES_COUNT
-            recent_entries = []
-            for _, row in df.tail(recent_count).iterrows():
-                recent_entries.append({
-                    'timestamp': row['timestamp'],
-                    'description': row['description'],
-                    'predicted_code': row['predicted_code'],
-                    'correct_code': row['correct_code'],
-                })
+            recent_entries = df.tail(recent_count)[
+                ['timestamp', 'description', 'predicted_code', 'correct_code']
+            ].to_dict('records')
             
             result = {
                 "total_entries": total,
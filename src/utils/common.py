@@ -2,8 +2,12 @@
 Common utility functions used across the HTS Classification System.
 """
 import re
+import time
+import threading
+from functools import lru_cache
+from itertools import islice
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from datetime import datetime, timedelta
 from loguru import logger
 
@@ -25,8 +29,8 @@ def calculate_cosine_similarity(embedding1: np.ndarray, embedding2: np.ndarray)
         Cosine similarity score (0-1)
     """
     try:
-        embedding1 = np.array(embedding1)
-        embedding2 = np.array(embedding2)
+        embedding1 = np.asarray(embedding1)
+        embedding2 = np.asarray(embedding2)
         
         norm1 = np.linalg.norm(embedding1)
         norm2 = np.linalg.norm(embedding2)
@@ -41,6 +45,20 @@ def calculate_cosine_similarity(embedding1: np.ndarray, embedding2: np.ndarray)
         logger.error(f"Error calculating cosine similarity: {str(e)}")
         return 0.0
 
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale vectors (the last axis) to unit length, so cosine similarity is a plain dot product.
+    
+    Args:
+        vectors: One vector or a matrix with one vector per row
+        
+    Returns:
+        float32 array of the same shape; all-zero vectors are returned unchanged
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
 def clean_and_validate_data(data: Any) -> Any:
     """Clean and validate data that might be in list or string format."""
     if isinstance(data, list):
@@ -51,6 +69,24 @@ def get_date_range(days: int) -> datetime:
     """Get cutoff date for filtering recent data."""
     return datetime.now() - timedelta(days=days)
 
+def chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    """
+    Split an iterable into lists of at most size items, consuming it lazily.
+    
+    Args:
+        iterable: Items to split (may be a generator)
+        size: Maximum number of items per chunk
+        
+    Returns:
+        Iterator over the chunks, in input order
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 def safe_divide(numerator: float, denominator: float, default: float = 0.0) -> float:
     """Safely divide two numbers, returning default if denominator is zero."""
     return numerator / denominator if denominator != 0 else default
@@ -59,6 +95,54 @@ def exponential_backoff_delay(retry_count: int, base_delay: float = 1.0) -> floa
     """Calculate exponential backoff delay."""
     return base_delay * (2 ** retry_count)
 
+class TokenBucketRateLimiter:
+    """
+    Thread-safe limiter with separate request and token budgets per minute.
+    
+    Both buckets refill continuously; ``acquire`` blocks until the call fits in both,
+    so callers stay under the quota instead of discovering it through 429s.
+    """
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._available_requests = float(requests_per_minute)
+        self._available_tokens = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float) -> None:
+        elapsed_minutes = (now - self._last_refill) / 60.0
+        self._available_requests = min(self.requests_per_minute,
+                                       self._available_requests + elapsed_minutes * self.requests_per_minute)
+        self._available_tokens = min(self.tokens_per_minute,
+                                     self._available_tokens + elapsed_minutes * self.tokens_per_minute)
+        self._last_refill = now
+    
+    def acquire(self, n_tokens: int = 0, n_requests: int = 1) -> None:
+        """Block until ``n_requests`` requests and ``n_tokens`` tokens are available, then take them."""
+        # A single call larger than a bucket could never fit, so cap it at a full bucket
+        n_tokens = min(n_tokens, self.tokens_per_minute)
+        n_requests = min(n_requests, self.requests_per_minute)
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                request_deficit = n_requests - self._available_requests
+                token_deficit = n_tokens - self._available_tokens
+                if request_deficit <= 0 and token_deficit <= 0:
+                    self._available_requests -= n_requests
+                    self._available_tokens -= n_tokens
+                    return
+                wait = 60.0 * max(request_deficit / self.requests_per_minute,
+                                  token_deficit / self.tokens_per_minute)
+            time.sleep(wait)
+    
+    def available_tokens(self) -> float:
+        """Tokens that could be taken right now without waiting."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._available_tokens
+
 def sanitize_string_input(input_str: str, max_length: int = 1000) -> str:
     """Sanitize and validate string input."""
     if not isinstance(input_str, str):
@@ -70,6 +154,11 @@ def sanitize_string_input(input_str: str, max_length: int = 1000) -> str:
     # Limit length
     return sanitized[:max_length].strip()
 
+@lru_cache(maxsize=4096)
+def normalize_description(description: str) -> str:
+    """Normalize a product description for exact-match comparison (case and padding insensitive)."""
+    return description.lower().strip()
+
 def extract_chapter_info(hts_code: str) -> Dict[str, str]:
     """Extract chapter and heading information from HTS code."""
     hts_code = str(hts_code).strip()
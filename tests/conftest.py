@@ -0,0 +1,7 @@
+"""
+Shared pytest setup: the application modules import each other from src/ (e.g. ``config.settings``).
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,149 @@
+"""
+Tests that the column-wise feedback analysis matches the original row-by-row loop.
+"""
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.azure_blob_feedback_trainer import AzureFeedbackTrainer
+
+def reference_analysis(feedback_df: pd.DataFrame) -> dict:
+    """The row-by-row analysis _analyze_feedback_data replaced, kept here as the oracle."""
+    analysis = {
+        'total_entries': len(feedback_df),
+        'total_corrections': 0,
+        'accuracy_rate': 0,
+        'top_patterns': [],
+        'problematic_chapters': [],
+        'chapter_performance': {}
+    }
+    if feedback_df.empty:
+        return analysis
+
+    corrections = feedback_df[feedback_df['predicted_code'] != feedback_df['correct_code']]
+    analysis['total_corrections'] = len(corrections)
+    analysis['accuracy_rate'] = (len(feedback_df) - len(corrections)) / len(feedback_df)
+
+    chapter_stats = {}
+    for _, row in corrections.iterrows():
+        pred_chapter = str(row['predicted_code'])[:2]
+        correct_chapter = str(row['correct_code'])[:2]
+        if pred_chapter != correct_chapter:
+            pattern = f"{pred_chapter}->{correct_chapter}"
+            chapter_stats[pattern] = chapter_stats.get(pattern, 0) + 1
+    analysis['top_patterns'] = sorted(chapter_stats.items(), key=lambda x: x[1], reverse=True)[:5]
+
+    chapter_errors = {}
+    for _, row in feedback_df.iterrows():
+        pred_chapter = str(row['predicted_code'])[:2]
+        stats = chapter_errors.setdefault(pred_chapter, {'total': 0, 'errors': 0})
+        stats['total'] += 1
+        if row['predicted_code'] != row['correct_code']:
+            stats['errors'] += 1
+
+    for chapter, stats in chapter_errors.items():
+        if stats['total'] >= 3 and stats['errors'] / stats['total'] > 0.4:
+            analysis['problematic_chapters'].append({
+                'chapter': chapter,
+                'error_rate': stats['errors'] / stats['total'],
+                'total_predictions': stats['total']
+            })
+
+    analysis['chapter_performance'] = chapter_errors
+    return analysis
+
+def reference_all_patterns(feedback_df: pd.DataFrame) -> dict:
+    """Every cross-chapter correction pattern with its count, per the reference loop."""
+    patterns = {}
+    for predicted, correct in zip(feedback_df['predicted_code'], feedback_df['correct_code']):
+        if predicted != correct and str(predicted)[:2] != str(correct)[:2]:
+            pattern = f"{str(predicted)[:2]}->{str(correct)[:2]}"
+            patterns[pattern] = patterns.get(pattern, 0) + 1
+    return patterns
+
+def _feedback(pairs) -> pd.DataFrame:
+    predicted, correct = zip(*pairs)
+    return pd.DataFrame({
+        'description': [f"item {i}" for i in range(len(pairs))],
+        'predicted_code': list(predicted),
+        'correct_code': list(correct),
+    })
+
+def _assert_same_analysis(actual: dict, expected: dict) -> None:
+    for key in ('total_entries', 'total_corrections', 'top_patterns', 'chapter_performance'):
+        assert actual[key] == expected[key], key
+    assert actual['accuracy_rate'] == pytest.approx(expected['accuracy_rate'])
+    by_chapter = lambda chapters: sorted(chapters, key=lambda entry: entry['chapter'])
+    assert by_chapter(actual['problematic_chapters']) == by_chapter(expected['problematic_chapters'])
+
+@pytest.fixture
+def trainer():
+    return AzureFeedbackTrainer(MagicMock())
+
+def test_matches_reference_on_mixed_feedback(trainer):
+    # Six cross-chapter patterns with distinct counts, so the top-5 cut does not depend on tie-breaking
+    pairs = (
+        [("8504.21.00", "8504.21.00")] * 6
+        + [("8504.21.00", "8504.31.40")] * 2       # same chapter, not a pattern
+        + [("8546.20.00", "8504.90.95")] * 3       # same chapter, not a pattern
+        + [("6109.10.00", "6205.20.20")] * 6
+        + [("7610.10.00", "4202.31.60")] * 5
+        + [("4202.31.60", "4202.31.60")] * 3
+        + [("3926.90.99", "8547.10.00")] * 4
+        + [("7318.15.20", "7216.33.00")] * 3
+        + [("9405.10.60", "8539.50.00")] * 2
+        + [("8413.70.20", "8504.21.00")] * 1
+    )
+    feedback_df = _feedback(pairs)
+
+    _assert_same_analysis(trainer._analyze_feedback_data(feedback_df), reference_analysis(feedback_df))
+
+def test_matches_reference_with_blank_and_missing_codes(trainer):
+    # Feedback is read from CSV, so missing codes arrive as NaN
+    pairs = [
+        ("8504.21.00", np.nan),
+        ("8504.21.00", np.nan),
+        (np.nan, "8504.21.00"),
+        ("", "8504.21.00"),
+        ("", "8504.21.00"),
+        ("", ""),
+        ("8", "8504.21.00"),
+        ("HS8504", "8504.21.00"),
+        ("HS8504", "8504.21.00"),
+        ("HS8504", "HS8504"),
+    ]
+    feedback_df = _feedback(pairs)
+
+    _assert_same_analysis(trainer._analyze_feedback_data(feedback_df), reference_analysis(feedback_df))
+
+def test_matches_reference_on_random_feedback(trainer):
+    rng = np.random.default_rng(7)
+    codes = ["8504.21.00", "8504.31.40", "8504.90.95", "8546.20.00", "8547.10.00",
+             "8536.90.40", "3926.90.99", "7610.10.00", "4202.31.60", "0101.21.00"]
+    predicted = rng.choice(codes, size=2000)
+    correct = np.where(rng.random(2000) < 0.6, predicted, rng.choice(codes, size=2000))
+    feedback_df = _feedback(list(zip(predicted, correct)))
+
+    actual = dict(trainer._analyze_feedback_data(feedback_df))
+    expected = reference_analysis(feedback_df)
+
+    # Pattern counts can tie here, so compare top patterns as counts rather than order
+    assert sorted(count for _, count in actual['top_patterns']) == \
+        sorted(count for _, count in expected['top_patterns'])
+    assert dict(actual['top_patterns']).items() <= dict(reference_all_patterns(feedback_df)).items()
+    actual['top_patterns'] = expected['top_patterns'] = []
+    _assert_same_analysis(actual, expected)
+
+def test_empty_feedback(trainer):
+    feedback_df = pd.DataFrame(columns=['description', 'predicted_code', 'correct_code'])
+
+    assert trainer._analyze_feedback_data(feedback_df) == reference_analysis(feedback_df)
+
+def test_repeated_analysis_is_served_from_cache(trainer):
+    feedback_df = _feedback([("8504.21.00", "8546.20.00")] * 3)
+
+    first = trainer._analyze_feedback_data(feedback_df)
+
+    assert trainer._analyze_feedback_data(feedback_df.copy()) is first
@@ -0,0 +1,178 @@
+"""
+Tests for GPTValidationService scoring, with the OpenAI calls replaced by a scripted model.
+"""
+import json
+import re
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services import gpt_service
+from services.gpt_service import GPTValidationService
+
+# Raw scores the scripted model gives each candidate code
+MODEL_SCORES = {
+    "8504.21.00": 85,
+    "8504.90.95": 62,
+    "8546.20.00": 140,  # out of range, clamped to 100
+    "4202.31.60": 70,
+    "7610.10.00": 55,
+}
+
+_CODE_PATTERN = re.compile(r"- Code: (\S+)")
+
+ITEMS = [
+    ("Liquid dielectric transformer 500 kVA", {"hts_code": "8504.21.00", "description": "Liquid dielectric transformers"}, "Electrical machinery"),
+    ("Air core reactor", {"hts_code": "8504.90.95", "description": "Parts", "units": ["kg"]}, ""),
+    ("Porcelain bushing", {"hts_code": "8546.20.00", "description": "Ceramic insulators", "general": "Free"}, ""),
+    # Category rules: confirmed heading is raised to 90, other chapters are capped at 30
+    ("Leather wallet", {"hts_code": "4202.31.60", "description": "Wallets of leather"}, ""),
+    ("Leather wallet", {"hts_code": "7610.10.00", "description": "Doors, windows and their frames"}, ""),
+]
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+class FakeStream:
+    """Streamed completion yielding the score a character at a time, as the API does."""
+
+    def __init__(self, text):
+        self._chunks = [_chunk(character) for character in text]
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+    def close(self):
+        self.closed = True
+
+class FakeAsyncStream(FakeStream):
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+def _scripted_completion(**request):
+    """Answer a chat completion request from MODEL_SCORES, in the shape the request asks for."""
+    codes = _CODE_PATTERN.findall(request["messages"][-1]["content"])
+    if request.get("stream"):
+        return FakeStream(f"{MODEL_SCORES[codes[0]]}\n")
+    scores = [MODEL_SCORES[code] for code in codes]
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(scores)))])
+
+class FakeAsyncRouter:
+    """AsyncOpenAIRouter replacement answering from MODEL_SCORES."""
+
+    requests = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def create_chat_completion(self, **request):
+        self.requests.append(request)
+        codes = _CODE_PATTERN.findall(request["messages"][-1]["content"])
+        return FakeAsyncStream(f"{MODEL_SCORES[codes[0]]}\n")
+
+def _make_service() -> GPTValidationService:
+    with patch.object(gpt_service, "get_openai_client", return_value=MagicMock()), \
+            patch.object(gpt_service, "CacheService") as cache_service:
+        cache_service.return_value.get_gpt_score.return_value = None
+        return GPTValidationService()
+
+@pytest.fixture(autouse=True)
+def plain_output(monkeypatch):
+    monkeypatch.setattr(gpt_service.Config, "GPT_STRUCTURED_OUTPUT", False)
+    FakeAsyncRouter.requests = []
+
+def test_single_validation_reads_streamed_score():
+    service = _make_service()
+    stream = FakeStream("85\n")
+    with patch.object(gpt_service, "create_chat_completion", return_value=stream):
+        assert service.validate_hts_match(*ITEMS[0]) == 85.0
+    assert stream.closed
+
+def test_batched_scores_match_per_candidate_scores():
+    per_candidate_service = _make_service()
+    with patch.object(gpt_service, "create_chat_completion", side_effect=_scripted_completion):
+        expected = [per_candidate_service.validate_hts_match(*item) for item in ITEMS]
+
+    batched_service = _make_service()
+    with patch.object(gpt_service, "create_chat_completion", side_effect=_scripted_completion) as completion:
+        scores = batched_service.validate_hts_matches(ITEMS)
+
+    assert scores == expected == [85.0, 62.0, 100.0, 90.0, 30.0]
+    # Every candidate went out in one non-streamed request
+    assert completion.call_count == 1
+    assert "stream" not in completion.call_args.kwargs
+
+def test_batched_scores_are_cached_per_candidate():
+    service = _make_service()
+    with patch.object(gpt_service, "create_chat_completion", side_effect=_scripted_completion) as completion:
+        first = service.validate_hts_matches(ITEMS)
+        second = service.validate_hts_matches(ITEMS)
+        single = service.validate_hts_match(*ITEMS[1])
+
+    assert first == second
+    assert single == first[1]
+    assert completion.call_count == 1
+    assert service.score_cache.save_gpt_score.call_count == len(ITEMS)
+
+def test_only_uncached_candidates_are_sent():
+    service = _make_service()
+    with patch.object(gpt_service, "create_chat_completion", side_effect=_scripted_completion) as completion:
+        service.validate_hts_match(*ITEMS[0])
+        scores = service.validate_hts_matches(ITEMS)
+
+    batch_prompt = completion.call_args.kwargs["messages"][-1]["content"]
+    assert _CODE_PATTERN.findall(batch_prompt) == [item[1]["hts_code"] for item in ITEMS[1:]]
+    assert scores[0] == 85.0
+
+@pytest.mark.parametrize("reply", ["[85, 62]", "not a score", "[85, 62, 100, 70, \"high\"]"])
+def test_unusable_batch_reply_falls_back_to_per_candidate_requests(reply):
+    service = _make_service()
+    response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+    with patch.object(gpt_service, "create_chat_completion", return_value=response), \
+            patch.object(gpt_service, "AsyncOpenAIRouter", FakeAsyncRouter):
+        scores = service.validate_hts_matches(ITEMS)
+
+    assert scores == [85.0, 62.0, 100.0, 90.0, 30.0]
+    assert len(FakeAsyncRouter.requests) == len(ITEMS)
+    assert all(request["stream"] for request in FakeAsyncRouter.requests)
+
+def test_oversized_batch_prompt_falls_back_without_a_batch_request(monkeypatch):
+    monkeypatch.setattr(gpt_service.Config, "GPT_MAX_INPUT_TOKENS", 10)
+    service = _make_service()
+    with patch.object(gpt_service, "create_chat_completion") as completion, \
+            patch.object(gpt_service, "AsyncOpenAIRouter", FakeAsyncRouter):
+        scores = service.validate_hts_matches(ITEMS)
+
+    completion.assert_not_called()
+    assert scores == [85.0, 62.0, 100.0, 90.0, 30.0]
+
+@pytest.mark.parametrize("reply, expected", [
+    ("[85, 62.5, 0]", [85.0, 62.5, 0.0]),
+    ("```json\n[85, 62, 40]\n```", [85.0, 62.0, 40.0]),
+    ("Scores: [150, -5, 40]", [100.0, 0.0, 40.0]),
+])
+def test_parse_score_array(reply, expected):
+    assert GPTValidationService._parse_score_array(reply, 3) == expected
+
+@pytest.mark.parametrize("reply", [
+    None,
+    "",
+    "85, 62, 40",          # no array
+    "[85, 62]",            # too short
+    "[85, 62, 40, 10]",    # too long
+    "[85, \"62\", 40]",    # non-numeric
+    "[85, null, 40]",
+    "[85, 62, ]",          # malformed JSON
+])
+def test_parse_score_array_rejects_unusable_replies(reply):
+    with pytest.raises(ValueError):
+        GPTValidationService._parse_score_array(reply, 3)
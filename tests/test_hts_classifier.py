@@ -0,0 +1,108 @@
+"""
+Tests that HTSClassifier.classify_batch returns what classify returns for each description,
+with the embedding search, HTS data and GPT scoring replaced by fixed answers.
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from classifier.hts_classifier import HTSClassifier
+
+# Each product maps to one embedding axis; the search returns that product's candidates
+PRODUCTS = {
+    "transformer": ["8504.21.00", "8504.22.00", "8504.90.95", "8546.20.00", "8536.90.40"],
+    "bushing": ["8546.20.00", "8547.10.00", "8504.90.95"],
+    "wallet": ["4202.31.60", "4202.32.10", "3926.90.99", "7610.10.00"],
+}
+_AXES = list(PRODUCTS)
+
+# GPT confidences by candidate code; the last candidates fall under the base threshold
+GPT_SCORES = {
+    "8504.21.00": 91.456, "8504.22.00": 64.0, "8504.90.95": 48.5, "8546.20.00": 12.0,
+    "8536.90.40": 5.0, "8547.10.00": 77.7, "4202.31.60": 88.0, "4202.32.10": 34.0,
+    "3926.90.99": 11.0, "7610.10.00": 8.0,
+}
+
+def _product_of(text: str) -> str:
+    return next(product for product in PRODUCTS if product in text.lower())
+
+def _encode(texts):
+    return np.array([np.eye(len(_AXES))[_AXES.index(_product_of(text))] for text in texts], dtype=np.float32)
+
+def _search_similar(query_embedding, top_k):
+    codes = PRODUCTS[_AXES[int(np.argmax(query_embedding))]][:top_k]
+    return SimpleNamespace(matches=[SimpleNamespace(metadata={'hts_code': code}) for code in codes])
+
+def _hts_code_info(hts_code):
+    return {'description': f"Goods of {hts_code}", 'general': "2.5%", 'units': ["No."]}
+
+@pytest.fixture
+def classifier():
+    preprocessor = MagicMock()
+    preprocessor.clean_text.side_effect = lambda text: " ".join(text.lower().split())
+    preprocessor.preprocess_descriptions.side_effect = lambda texts: [preprocessor.clean_text(t) for t in texts]
+    preprocessor.encode_text.side_effect = _encode
+
+    data_loader = MagicMock()
+    data_loader.get_hts_code_info.side_effect = _hts_code_info
+    data_loader.hts_code_backwalk.side_effect = lambda hts_code: f"Heading {hts_code[:4]} > {hts_code}"
+
+    gpt_service = MagicMock()
+    gpt_service.validate_hts_matches.side_effect = lambda items: [GPT_SCORES[info['hts_code']] for _, info, _ in items]
+
+    embedding_service = MagicMock()
+    embedding_service.search_similar.side_effect = _search_similar
+
+    # Skip __init__, which connects to Pinecone, OpenAI and Azure
+    classifier = HTSClassifier.__new__(HTSClassifier)
+    classifier.data_loader = data_loader
+    classifier.preprocessor = preprocessor
+    classifier.embedding_service = embedding_service
+    classifier.gpt_service = gpt_service
+    return classifier
+
+DESCRIPTIONS = [
+    "Liquid-filled transformer 500 kVA",
+    "Porcelain BUSHING, 25 kV",
+    "Leather wallet",
+    "Dry type   transformer 75 kVA",
+]
+
+@pytest.mark.parametrize("top_k", [1, 3, 5])
+def test_classify_batch_matches_classify(classifier, top_k):
+    expected = [classifier.classify(description, top_k=top_k) for description in DESCRIPTIONS]
+
+    classifier.preprocessor.encode_text.reset_mock()
+    batch = classifier.classify_batch(DESCRIPTIONS, top_k=top_k)
+
+    assert batch == expected
+    # The batch embeds every description in one request
+    classifier.preprocessor.encode_text.assert_called_once()
+
+def test_classify_ranks_and_filters_candidates(classifier):
+    results = classifier.classify("Liquid-filled transformer 500 kVA", top_k=3)
+
+    assert [result['hts_code'] for result in results] == ["8504.21.00", "8504.22.00", "8504.90.95"]
+    assert results[0]['confidence'] == 91.46
+    assert results[0]['description'] == "Heading 8504 > 8504.21.00"
+    assert results[0]['general_rate'] == "2.5%"
+
+def test_classify_batch_isolates_failures(classifier):
+    search = classifier.embedding_service.search_similar.side_effect
+
+    def failing_for_bushing(query_embedding, top_k):
+        if _AXES[int(np.argmax(query_embedding))] == "bushing":
+            raise RuntimeError("search unavailable")
+        return search(query_embedding, top_k)
+
+    classifier.embedding_service.search_similar.side_effect = failing_for_bushing
+    batch = classifier.classify_batch(DESCRIPTIONS)
+
+    assert batch[1] == []
+    assert [len(results) for results in batch] == [3, 0, 3, 3]
+
+def test_classify_batch_of_nothing(classifier):
+    assert classifier.classify_batch([]) == []
+    classifier.preprocessor.encode_text.assert_not_called()
@@ -0,0 +1,71 @@
+"""
+Tests for TokenBucketRateLimiter refill and blocking behaviour, on a fake clock.
+"""
+import pytest
+
+from utils import common
+from utils.common import TokenBucketRateLimiter
+
+class FakeClock:
+    """Stands in for time.monotonic/time.sleep; sleeping just advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(common.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(common.time, "sleep", fake.sleep)
+    return fake
+
+def test_starts_full_and_takes_without_waiting(clock):
+    limiter = TokenBucketRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    limiter.acquire(n_tokens=100)
+
+    assert clock.sleeps == []
+    assert limiter.available_tokens() == pytest.approx(500)
+
+def test_refills_continuously_up_to_capacity(clock):
+    limiter = TokenBucketRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    limiter.acquire(n_tokens=600)
+    assert limiter.available_tokens() == pytest.approx(0)
+
+    clock.now += 15  # a quarter of a minute
+    assert limiter.available_tokens() == pytest.approx(150)
+
+    clock.now += 600
+    assert limiter.available_tokens() == pytest.approx(600)
+
+def test_waits_for_token_deficit(clock):
+    limiter = TokenBucketRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    limiter.acquire(n_tokens=600)
+    limiter.acquire(n_tokens=300)
+
+    # 300 tokens at 600/minute take 30 seconds to refill
+    assert sum(clock.sleeps) == pytest.approx(30)
+    assert limiter.available_tokens() == pytest.approx(0)
+
+def test_waits_for_request_deficit(clock):
+    limiter = TokenBucketRateLimiter(requests_per_minute=2, tokens_per_minute=1000)
+    limiter.acquire()
+    limiter.acquire()
+    limiter.acquire()
+
+    # One request at 2/minute takes 30 seconds to refill
+    assert sum(clock.sleeps) == pytest.approx(30)
+
+def test_oversized_call_is_capped_at_a_full_bucket(clock):
+    limiter = TokenBucketRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    limiter.acquire(n_tokens=10000)
+
+    assert clock.sleeps == []
+    assert limiter.available_tokens() == pytest.approx(0)
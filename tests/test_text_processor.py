@@ -0,0 +1,80 @@
+"""
+Tests that the precompiled TextPreprocessor.clean_text matches the original sequential re.sub version.
+"""
+import re
+from unittest.mock import patch
+
+import pytest
+
+from preprocessor import text_processor
+from preprocessor.text_processor import TextPreprocessor
+
+def reference_clean_text(preprocessor: TextPreprocessor, text: str) -> str:
+    """The re.sub-per-rule clean_text the precompiled version replaced, kept here as the oracle."""
+    text = text.lower()
+
+    for key, expanded in preprocessor.category_keywords.items():
+        if key in text:
+            text = f"{text} {expanded}"
+
+    for pattern, replacement in preprocessor.material_replacements.items():
+        text = re.sub(pattern, replacement, text)
+    for pattern, replacement in preprocessor.measurement_replacements.items():
+        text = re.sub(pattern, replacement, text)
+    for pattern, replacement in preprocessor.state_replacements.items():
+        text = re.sub(pattern, replacement, text)
+
+    text = re.sub(r'(\d+)\s*k\s*gold', r'\1k-gold', text)
+    text = re.sub(r'(\d+)\s*v\b', r'\1v', text)
+    text = re.sub(r'(\d+)\s*w\b', r'\1w', text)
+    text = re.sub(r'(\d+)\s*hz\b', r'\1hz', text)
+    text = re.sub(r'(\d+)\s*mm?\b', r'\1mm', text)
+    text = re.sub(r'(\d+)\s*cm?\b', r'\1cm', text)
+    text = re.sub(r'(\d+)\s*x\s*(\d+)', r'\1x\2', text)
+
+    text = re.sub(r'(\d+)\s*percent\b', r'\1%', text)
+    text = re.sub(r'(\d+)\s*pct\b', r'\1%', text)
+
+    text = re.sub(r'[^a-z0-9\s\-%\/]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+DESCRIPTIONS = [
+    "Liquid-filled Transformer, 500 kVA, 13800 V / 480 V, 60 Hz",
+    "Dry type transformer 75kVA 600V 3-phase",
+    "Air core reactor 1.5 mH, 2000 A, 34.5 kV",
+    "Porcelain bushing 25 kV, 1200 A (new)",
+    "Used stainless steel sink 60 x 45 cm",
+    "Carbon Steel bolts M12 x 50 mm, 100 pcs",
+    "Aluminium window frame 120x90 cm",
+    "Polyvinyl chloride insulated cable 3 meters",
+    "Poly vinyl chloride tubing 10 millimeters, 5 Kilograms",
+    "14 K gold ring, 3 grams",
+    "Cotton t-shirt 100 percent cotton",
+    "Polyester jacket, 35 pct recycled",
+    "Refurbished coffee maker 1200 W 120V",
+    "Remanufactured solar panel 400 W, 1.7 square meters",
+    "Leather wallet & handbag set",
+    "Polyethylene / polypropylene film, 2 litres, 12 inches",
+    "Electrical steel laminations, 0.27 mm, 50 feet",
+    "Oil tank 500 gallons, 2 cubic meters, 3 pounds, 8 ounces",
+    "Transformer parts: tap changer @ 5% steps; 1.5 m",
+    "Cable 4 c x 2 m, 12 v DC, 50 hz, 300w",
+    "  Multiple   spaces\tand\nnewlines  ",
+    "",
+    "ÄÖÜ unicode — dash and “quotes”",
+]
+
+@pytest.fixture(scope="module")
+def preprocessor():
+    with patch.object(text_processor, "EmbeddingService"):
+        yield TextPreprocessor()
+
+@pytest.mark.parametrize("description", DESCRIPTIONS)
+def test_clean_text_matches_reference(preprocessor, description):
+    assert preprocessor.clean_text(description) == reference_clean_text(preprocessor, description)
+
+def test_preprocess_descriptions_matches_reference(preprocessor):
+    assert preprocessor.preprocess_descriptions(DESCRIPTIONS) == [
+        reference_clean_text(preprocessor, description) for description in DESCRIPTIONS
+    ]